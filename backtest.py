@@ -0,0 +1,102 @@
+import numpy as np
+import utils as ut
+
+
+def load_returns(path: str, column: str = "return") -> np.ndarray:
+    """
+    Load a series of monthly (simple) returns, e.g. 0.012 for +1.2% in a month.
+
+    A .npy file is memory-mapped. Otherwise, `path` is a CSV file with a header line,
+    from which the column `column` is loaded in one go.
+    """
+    if path.endswith(".npy"):
+        return np.load(path, mmap_mode="r")
+    with open(path, encoding="utf8") as f:
+        header = [name.strip() for name in f.readline().split(",")]
+    if column not in header:
+        raise ValueError(f"Column {column!r} not found in {path}. Found {header}.")
+    return np.loadtxt(
+        path, delimiter=",", skiprows=1, usecols=header.index(column), ndmin=1
+    )
+
+
+def backtest(
+    monthly_returns: np.ndarray,
+    initial_balance: float | np.ndarray,
+    regular_contribution: float | np.ndarray,
+    growth_years: int,
+    consume_years: int,
+    annual_rate_of_return: float,
+    annual_rate_of_inflation: float,
+    monthly_withdrawal: float | np.ndarray | None = None,
+) -> dict[str, np.ndarray]:
+    """
+    Run a scenario against every historical start month of `monthly_returns`.
+
+    Every window of 12 * (growth_years + consume_years) consecutive months is one path
+    as in montecarlo.simulate: during the growth years, the balance grows with the
+    monthly return and then `regular_contribution` is added; during the consume years,
+    an inflation-indexed amount is taken out at the beginning of each month and the
+    rest grows. By default, the first withdrawal is the monthly purchasing power of
+    the end balance of the window, planned with `annual_rate_of_return`.
+
+    With the prefix log-sums L_t = sum_{i<t} log(1 + return_i), the sums over each
+    window in the closed forms of montecarlo.simulate become differences of prefix
+    sums of exp(-L_t) and q^t exp(-L_t). So all windows take O(months) time instead
+    of O(months * window).
+
+    `initial_balance`, `regular_contribution` and `monthly_withdrawal` can be arrays
+    of scenarios. They are broadcast against each other and the windows are added as
+    the last axis.
+
+    Returns
+        "start month": the index of the first month of each window,
+        "end balance": the balance after the growth years,
+        "final balance": the balance after the consume years (negative if depleted),
+        "depleted": whether the withdrawals exceeded the balance at some point.
+    """
+    T = 12 * growth_years
+    K = 12 * consume_years
+    log_growth = np.log1p(np.asarray(monthly_returns, dtype=float))
+    n_windows = len(log_growth) - (T + K) + 1
+    if n_windows < 1:
+        raise ValueError(
+            f"The return series has {len(log_growth)} months, but a window has"
+            f" {T + K} months."
+        )
+    K_0 = np.asarray(initial_balance, dtype=float)[..., np.newaxis]
+    m = np.asarray(regular_contribution, dtype=float)[..., np.newaxis]
+
+    # L[t] = log of the growth factor of the first t months
+    L = np.concatenate([[0.0], np.cumsum(log_growth)])
+    s = np.arange(n_windows)
+
+    # accumulation: G_T (K_0 + m sum_{t=1}^{T} 1 / G_t) with G_t = exp(L[s+t] - L[s])
+    E = np.concatenate([[0.0], np.cumsum(np.exp(-L[1:]))])
+    discounted_contributions = np.exp(L[s]) * (E[s + T] - E[s])
+    end_balance = np.exp(L[s + T] - L[s]) * (K_0 + m * discounted_contributions)
+
+    if monthly_withdrawal is None:
+        w = ut.monthly_purchasing_power(
+            end_balance, consume_years, annual_rate_of_return, annual_rate_of_inflation
+        )
+    else:
+        w = np.asarray(monthly_withdrawal, dtype=float)[..., np.newaxis]
+
+    # decumulation: sum_{j=0}^{K-1} w q^j / G'_j with G'_j = exp(L[s0+j] - L[s0])
+    log_q = np.log1p(annual_rate_of_inflation) / 12
+    t = np.arange(len(L))
+    F = np.concatenate([[0.0], np.cumsum(np.exp(t * log_q - L))])
+    s0 = s + T
+    discounted_withdrawals = np.exp(L[s0] - s0 * log_q) * (F[s0 + K] - F[s0])
+
+    remaining = end_balance - w * discounted_withdrawals
+    final_balance = np.exp(L[s0 + K] - L[s0]) * remaining
+    shape = np.broadcast_shapes(end_balance.shape, final_balance.shape)
+    return {
+        "start month": s,
+        "end balance": np.broadcast_to(end_balance, shape),
+        "final balance": final_balance,
+        # more than a cent short (ignores rounding errors of exactly planned paths)
+        "depleted": remaining < -1e-2,
+    }
@@ -0,0 +1,233 @@
+"""
+Benchmarks of the computations behind the reports.
+
+Run
+    python benchmark.py --size small
+to measure the throughput (scenarios per second) and the peak memory of every
+benchmark and to compare them to benchmark_baseline.json. The script exits with
+status 1 if a benchmark regressed by more than the threshold. Use
+--update-baseline to store the current measurements as the new baseline.
+"""
+
+from typing import Callable
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+import grid
+import loan
+import main
+import table
+import utils as ut
+
+BASELINE_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json"
+)
+# number of scenarios per size
+SIZES = {"small": 1_000, "medium": 10_000, "large": 100_000}
+REPEATS = 5
+
+
+def _scenarios(n: int, seed: int = 0) -> dict[str, np.ndarray]:
+    """
+    `n` random but reproducible scenarios.
+    """
+    rng = np.random.default_rng(seed)
+    return {
+        "start balance": rng.integers(0, 20, n) * 100_000.0,
+        "rate": rng.integers(0, 100, n) / 1_000,
+        "contribution": rng.integers(0, 30, n) * 100.0,
+        "years": rng.integers(1, 51, n),
+        "inflation": rng.integers(0, 50, n) / 1_000,
+    }
+
+
+def bench_compound_interest(n: int) -> Callable:
+    s = _scenarios(n)
+    return lambda: ut.compound_interest(
+        s["start balance"], s["rate"], s["contribution"], 12, s["years"]
+    )
+
+
+def bench_compound_interest_rate_batch(n: int) -> Callable:
+    s = _scenarios(n)
+    # up to 50 years of monthly contributions, i.e., N * P up to 600
+    final = ut.compound_interest(
+        s["start balance"], s["rate"], s["contribution"] + 100, 12, s["years"]
+    )
+    return lambda: ut.compound_interest_rate_batch(
+        s["start balance"], final, s["contribution"] + 100, 12, s["years"]
+    )
+
+
+def bench_compound_interest_rate_roots(n: int) -> Callable:
+    # the polynomial roots are expensive, so only a few are solved (N * P = 300)
+    s = _scenarios(n // 1_000)
+    final = ut.compound_interest(
+        s["start balance"], s["rate"], s["contribution"] + 100, 12, 25
+    )
+
+    def run():
+        for i in range(len(final)):
+            ut.compound_interest_rate(
+                s["start balance"][i], final[i], s["contribution"][i] + 100, 12, 25
+            )
+
+    return run
+
+
+def bench_monthly_purchasing_power(n: int) -> Callable:
+    s = _scenarios(n)
+    return lambda: ut.monthly_purchasing_power(
+        s["start balance"], s["years"], s["rate"], s["inflation"]
+    )
+
+
+def bench_ci(n: int) -> Callable:
+    # n trajectories of 40 years of monthly contributions
+    s = _scenarios(n)
+    return lambda: main.ci(s["start balance"], s["rate"], s["contribution"], 12, 40)
+
+
+def bench_rep(n: int) -> Callable:
+    # one loan at a time, as in repay()
+    s = _scenarios(n // 10)
+    installments = s["start balance"] * 0.01 + 1_000
+
+    def run():
+        for i in range(len(installments)):
+            main.rep(s["start balance"][i], s["rate"][i] / 2, installments[i], 12)
+
+    return run
+
+
+def bench_etf_grid(n: int) -> Callable:
+    # the grid of etf.py (3780 rows) with n / 1000 times as many start balances
+    def run():
+        columns = grid.etf_grid(
+            contributions=[0, 500, 1000, 1500, 2000, 2500, 3000],
+            start_balances=np.linspace(0, 2_000_000, 20 * n // 1_000),
+            rates=[0.05, 0.06, 0.07],
+            growth_years=[10, 20, 30],
+            consume_years=[20, 30, 40],
+            inflation=0.03,
+        )
+        with open(os.devnull, "w", encoding="utf8") as f:
+            table.write_table(f, columns, formats={name: "{:.0f}" for name in columns})
+
+    return run
+
+
+BENCHMARKS = {
+    "compound_interest": (bench_compound_interest, 1),
+    "compound_interest_rate_batch": (bench_compound_interest_rate_batch, 1),
+    "compound_interest_rate (roots)": (bench_compound_interest_rate_roots, 1 / 1_000),
+    "monthly_purchasing_power": (bench_monthly_purchasing_power, 1),
+    "main.ci": (bench_ci, 1),
+    "main.rep": (bench_rep, 1 / 10),
+    "etf.py grid": (bench_etf_grid, 3.78),
+}
+
+
+def measure(setup: Callable, n: int, scenarios: float) -> dict[str, float]:
+    """
+    The best throughput of REPEATS runs and the peak memory of one traced run.
+    """
+    run = setup(n)
+    best = min(_timed(run) for _ in range(REPEATS))
+
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "scenarios_per_s": float(f"{scenarios * n / best:.4g}"),
+        "peak_mib": float(f"{peak / 2**20:.4g}"),
+    }
+
+
+def _timed(run: Callable) -> float:
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+def compare(
+    results: dict[str, dict], baseline: dict[str, dict], threshold: float
+) -> list[str]:
+    """
+    Descriptions of all benchmarks whose throughput dropped or whose peak memory grew
+    by more than `threshold` (relative) compared to the baseline.
+    """
+    regressions = list()
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        if result["scenarios_per_s"] < (1 - threshold) * base["scenarios_per_s"]:
+            regressions.append(
+                f"{name}: {result['scenarios_per_s']:.3g} scenarios/s"
+                f" (baseline {base['scenarios_per_s']:.3g})"
+            )
+        if result["peak_mib"] > (1 + threshold) * base["peak_mib"] + 0.1:
+            regressions.append(
+                f"{name}: {result['peak_mib']:.1f} MiB peak memory"
+                f" (baseline {base['peak_mib']:.1f})"
+            )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the computations.")
+    parser.add_argument("--size", choices=list(SIZES), default="small")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.5,
+        help="allowed relative regression (default: 0.5)",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help=f"store the results in {os.path.basename(BASELINE_FILE)}",
+    )
+    parser.add_argument(
+        "benchmarks", nargs="*", help="benchmarks to run (default: all)"
+    )
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name!r}")
+
+    n = SIZES[args.size]
+    results = dict()
+    for name, (setup, scenarios) in BENCHMARKS.items():
+        if args.benchmarks and name not in args.benchmarks:
+            continue
+        results[name] = measure(setup, n, scenarios)
+        print(
+            f"{name:>32}: {results[name]['scenarios_per_s']:10.3g} scenarios/s,"
+            f" {results[name]['peak_mib']:8.1f} MiB peak"
+        )
+
+    baselines = dict()
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, encoding="utf8") as f:
+            baselines = json.load(f)
+
+    if args.update_baseline:
+        baselines[args.size] = {**baselines.get(args.size, dict()), **results}
+        with open(BASELINE_FILE, "w", encoding="utf8") as f:
+            json.dump(baselines, f, indent=4)
+            f.write("\n")
+        print(f"Updated {BASELINE_FILE}")
+    else:
+        regressions = compare(results, baselines.get(args.size, dict()), args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        sys.exit(1 if regressions else 0)
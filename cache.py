@@ -0,0 +1,146 @@
+from collections import OrderedDict
+from typing import Callable
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import numpy as np
+import grid
+import manifest
+import tax as tx
+import utils as ut
+
+# directory of the on-disk store; None disables it
+_directory = os.environ.get("FINANCE_CACHE_DIR")
+
+
+def set_directory(directory: str | None):
+    """
+    Store results on disk in `directory` (one subdirectory per function), or disable
+    the on-disk store with None. The environment variable FINANCE_CACHE_DIR sets the
+    initial directory.
+    """
+    global _directory
+    _directory = directory
+
+
+def normalize(value):
+    """
+    A hashable representation of an argument, e.g. for the key of a cache. Numbers
+    are rounded to 12 significant digits (and ints become floats), so that, e.g.,
+    0.1 + 0.2 and 0.3 give the same key. Numeric sequences and arrays are
+    represented by a hash of their rounded values.
+    """
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(f"{float(value):.12g}") + 0.0  # -0.0 -> 0.0
+    array = np.asarray(value)
+    if array.dtype.kind in "biuf":
+        rounded = np.array(
+            [float(f"{x:.12g}") for x in array.astype(float).ravel().tolist()]
+        )
+        digest = hashlib.sha256((rounded + 0.0).tobytes()).hexdigest()
+        return ("array", array.shape, digest)
+    raise TypeError(f"Cannot use an argument of type {type(value)} as a cache key.")
+
+
+def memoize(
+    func: Callable = None,
+    maxsize: int = 1024,
+    depends: tuple = (),
+    ignore: tuple[str, ...] = (),
+) -> Callable:
+    """
+    Cache the results of `func` in an in-process LRU with at most `maxsize` entries
+    and, if a directory is set (see set_directory), on disk.
+
+    The key consists of all arguments (including defaults) after normalization,
+    except the arguments named in `ignore` that do not change the result (e.g. the
+    number of worker processes). On disk, results are stored per code version of
+    `func` and the modules or functions in `depends` that it calls (see
+    manifest.code_version), so results of older code are not reused. The wrapper has
+    cache_info() with hit and miss statistics and cache_clear(). Cached results are
+    shared, so callers must not modify them.
+    """
+    if func is None:
+        return functools.partial(
+            memoize, maxsize=maxsize, depends=depends, ignore=ignore
+        )
+    signature = inspect.signature(func)
+    lru = OrderedDict()
+    stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+    @functools.cache
+    def code() -> str:
+        # computed on first use of the disk store, as it reads the source files
+        return manifest.code_version(func, *depends)
+
+    def disk_file(key) -> str | None:
+        if _directory is None:
+            return None
+        name = hashlib.sha256(repr(key).encode()).hexdigest() + ".pkl"
+        return os.path.join(
+            _directory, f"{func.__module__}.{func.__name__}", code(), name
+        )
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = tuple(
+            (name, normalize(v))
+            for name, v in bound.arguments.items()
+            if name not in ignore
+        )
+
+        if key in lru:
+            stats["hits"] += 1
+            lru.move_to_end(key)
+            return lru[key]
+
+        path = disk_file(key)
+        if path is not None and os.path.exists(path):
+            stats["disk_hits"] += 1
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+        else:
+            stats["misses"] += 1
+            result = func(*args, **kwargs)
+            if path is not None:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # write to a temporary file first so that readers never see a
+                # partially written result
+                with open(path + f".{os.getpid()}.tmp", "wb") as f:
+                    pickle.dump(result, f)
+                os.replace(path + f".{os.getpid()}.tmp", path)
+
+        lru[key] = result
+        if len(lru) > maxsize:
+            lru.popitem(last=False)
+        return result
+
+    def cache_info() -> dict[str, int]:
+        return {**stats, "currsize": len(lru), "maxsize": maxsize}
+
+    def cache_clear():
+        """
+        Clear the in-process LRU and the statistics (not the on-disk store).
+        """
+        lru.clear()
+        stats.update(hits=0, disk_hits=0, misses=0)
+
+    wrapper.cache_info = cache_info
+    wrapper.cache_clear = cache_clear
+    return wrapper
+
+
+# cached versions of the expensive computations
+compound_interest_rate = memoize(ut.compound_interest_rate, maxsize=4096, depends=(ut,))
+monthly_purchasing_power = memoize(
+    ut.monthly_purchasing_power, maxsize=4096, depends=(ut,)
+)
+etf_grid = memoize(
+    grid.etf_grid, maxsize=16, depends=(grid, tx, ut), ignore=("workers",)
+)
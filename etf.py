@@ -1,8 +1,15 @@
 from datetime import datetime
-from tabulate import tabulate
+import argparse
+import os
 from textwrap import dedent
-import pandas as pd
+import cache
+import grid
+import instrument
+import manifest
 import pytz
+import store
+import table
+import tax as tx
 import utils as ut
 
 
@@ -34,97 +41,170 @@ start_balances = [
     1800_000,
     2000_000,
 ]
+# "flat" or "german" (see grid.etf_rows)
+tax = "flat"
+
+# the tax note of etf.txt
+tax_notes = {
+    "flat": "Net values are after subtracting 0.25 * 1.055 tax.",
+    "german": (
+        "Net values are after German tax (see tax.py): Vorabpauschale, realized gains,"
+        f" {tx.PARTIAL_EXEMPTION} partial exemption and an allowance of"
+        f" {tx.ALLOWANCE} € per year."
+    ),
+}
 
-t_dict = {
-    "contribution": list(),
-    "start balance": list(),
-    "rate": list(),
-    "growth years": list(),
-    "end balance": list(),
-    # "net interest": list(),
-    "net interest (today)": list(),
-    "consume years": list(),
-    "net MPP": list(),
-    "net MPP (today)": list(),
+# columns of etf.txt and how to format them
+column_formats = {
+    "contribution": "{}",
+    "start balance": "{:.0f} k",
+    "rate": "{}",
+    "growth years": "{}",
+    "end balance": "{:.0f} k",
+    # "net interest": "{:.0f}",
+    "net interest (today)": "{:.0f}",
+    "consume years": "{}",
+    "net MPP": "{:.0f}",
+    "net MPP (today)": "{:.0f}",
 }
-for c in contributions:
-    for sb in start_balances:
-        for r in rates:
-            for gy in growth_years:
-                for cy in consume_years:
-                    t_dict["contribution"].append(c)
-                    t_dict["start balance"].append(f"{sb/1e3:.0f} k")
-                    t_dict["rate"].append(r)
-                    t_dict["growth years"].append(gy)
-                    t_dict["consume years"].append(cy)
-
-                    eb = ut.compound_interest(
-                        initial_balance=sb,
-                        annual_interest_rate=r,
-                        regular_contribution=c,
-                        contributions_per_year=contributions_per_year,
-                        years=gy,
-                    )
-                    t_dict["end balance"].append(f"{eb/1e3:.0f} k")
-
-                    monthly_rate = ut.annual_to_monthly(r) - 1
-                    interest = eb * monthly_rate
-                    net_interest = ut.subtract_gains_tax(interest)
-                    # t_dict["net interest"].append(f"{net_interest:.0f}")
-
-                    net_interest_today = ut.value_today(
-                        x=net_interest, years=gy, annual_rate_of_inflation=inflation
-                    )
-                    t_dict["net interest (today)"].append(f"{net_interest_today:.0f}")
-
-                    mpp = ut.monthly_purchasing_power(
-                        start_balance=eb,
-                        years_to_consume=cy,
-                        annual_rate_of_return=r,
-                        annual_rate_of_inflation=inflation,
-                    )
-
-                    net_mpp = ut.subtract_gains_tax(mpp)
-                    t_dict["net MPP"].append(f"{net_mpp:.0f}")
-
-                    net_mpp_today = ut.value_today(
-                        x=net_mpp, years=gy, annual_rate_of_inflation=inflation
-                    )
-                    t_dict["net MPP (today)"].append(f"{net_mpp_today:.0f}")
-
-
-out_file = "etf.txt"
-with open(out_file, "w", encoding="utf8") as f:
-    f.write(
-        dedent(
-            f"""
-            Generated on {pytz.timezone('Europe/Berlin').localize(datetime.now()).ctime()} (timezone Berlin).
-
-            The annual inflation rate is {inflation}.
-            Every "(today)" value takes a future value and computes its value today
-            by taking into account inflation and the number of growth years.
-            For example, with 0.03 annual inflation, a value of 100 € in 30 years
-            corresponds to {ut.value_today(100, 30, 0.03):.2f} € today.
-
-            There are monthly contributions during the growth years. There is no contribution during the consume years.
-
-            Net values are after subtracting 0.25 * 1.055 tax.
-
-            "interest" is the interest that the end balance generates in one month.
-
-            "MPP" is the monthly purchasing power.
-            That is, "MPP" is the value that can be spent in the first month of the consume years.
-            In every following month, MPP can be increased by an amount corresponding to the inflation rate.
-            At the end of the last consume year, the remaining balance will be zero.
-
-            """
-        )
+
+
+def main(force: bool = False, workers: int | None = None):
+    """
+    Generate etf.txt and the numeric columns in etf.columns/ (see store.py).
+
+    Nothing is done if both were generated with the same parameters and code (see
+    manifest.py). If only axis values changed, only the rows with new axis values
+    are computed and the other rows are taken from etf.columns/. `force` recomputes
+    everything. Large grids are computed by `workers` processes (see
+    grid.parallel_grid).
+
+    The time spent in each stage is recorded if the instrumentation is enabled (see
+    instrument.py).
+    """
+    out_file = "etf.txt"
+    columns_dir = "etf.columns"
+    axes = grid.etf_axes(
+        contributions=contributions,
+        start_balances=start_balances,
+        rates=rates,
+        growth_years=growth_years,
+        consume_years=consume_years,
     )
+    params = {
+        "axes": axes,
+        "inflation": inflation,
+        "contributions_per_year": contributions_per_year,
+        "tax": tax,
+        "column_formats": column_formats,
+    }
+    code = manifest.code_version(main, grid, store, table, tx, ut)
+    if not force and manifest.is_up_to_date("etf", params, code):
+        print(f"{out_file} is up to date")
+        return
+
+    entry = manifest.load().get("etf")
+    if (
+        not force
+        and entry is not None
+        and entry["code"] == code
+        and {**entry["params"], "axes": axes} == params
+        and os.path.exists(columns_dir)
+    ):
+        with instrument.stage("etf: compute"):
+            columns, n_computed = grid.merge(
+                axes,
+                entry["params"]["axes"],
+                store.load_columns(columns_dir),
+                lambda rows: grid.etf_rows(
+                    rows, inflation, contributions_per_year, tax
+                ),
+            )
+    else:
+        with instrument.stage("etf: compute"):
+            columns = cache.etf_grid(
+                contributions=contributions,
+                start_balances=start_balances,
+                rates=rates,
+                growth_years=growth_years,
+                consume_years=consume_years,
+                inflation=inflation,
+                contributions_per_year=contributions_per_year,
+                workers=workers,
+                tax=tax,
+            )
+        n_computed = len(columns["rate"])
+    with instrument.stage("etf: store"):
+        store.save_columns(columns_dir, columns)
+
+    # scale to k€ (in a new dictionary since cached results are shared)
+    columns = {
+        **columns,
+        "start balance": columns["start balance"] / 1e3,
+        "end balance": columns["end balance"] / 1e3,
+    }
+
+    with instrument.stage("etf: table"), open(out_file, "w", encoding="utf8") as f:
+        f.write(
+            dedent(
+                f"""
+                Generated on {pytz.timezone('Europe/Berlin').localize(datetime.now()).ctime()} (timezone Berlin).
+
+                The annual inflation rate is {inflation}.
+                Every "(today)" value takes a future value and computes its value today
+                by taking into account inflation and the number of growth years.
+                For example, with 0.03 annual inflation, a value of 100 € in 30 years
+                corresponds to {ut.value_today(100, 30, 0.03):.2f} € today.
+
+                There are monthly contributions during the growth years. There is no contribution during the consume years.
+
+                {tax_notes[tax]}
+
+                "interest" is the interest that the end balance generates in one month.
+
+                "MPP" is the monthly purchasing power.
+                That is, "MPP" is the value that can be spent in the first month of the consume years.
+                In every following month, MPP can be increased by an amount corresponding to the inflation rate.
+                At the end of the last consume year, the remaining balance will be zero.
+
+                """
+            )
+        )
 
-    df = pd.DataFrame(t_dict)
-    table = tabulate(
-        df, headers="keys", tablefmt="grid", showindex=False, disable_numparse=True
+        table.write_table(
+            f,
+            {name: columns[name] for name in column_formats},
+            formats=column_formats,
+            tablefmt="grid",
+        )
+
+    manifest.record("etf", params, code, outputs=[out_file, columns_dir])
+    print(
+        f"Generated {out_file} and {columns_dir}"
+        f" ({n_computed} of {len(columns['rate'])} rows computed)"
     )
-    f.write(table)
 
-print(f"Generated {out_file}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate etf.txt.")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="regenerate everything even if it is up to date",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        help="number of processes for large grids (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--stats",
+        metavar="FILE",
+        help="write solver counters and stage timers to FILE as JSON",
+    )
+    args = parser.parse_args()
+    if args.stats:
+        instrument.enable(args.stats)
+    main(force=args.force, workers=args.workers)
+    instrument.dump()
@@ -0,0 +1,323 @@
+from typing import Callable
+import functools
+import os
+import numpy as np
+import instrument
+import tax as tx
+import utils as ut
+
+
+def cartesian(axes: dict[str, list]) -> dict[str, np.ndarray]:
+    """
+    The Cartesian product of the given axes as flat columns.
+
+    The first axis varies slowest and the last axis varies fastest, i.e., the rows
+    are in the same order as in nested for loops over the axes.
+    Every column keeps the dtype of its axis.
+    """
+    grids = np.meshgrid(
+        *[np.asarray(values) for values in axes.values()], indexing="ij"
+    )
+    return {name: grid.ravel() for name, grid in zip(axes, grids)}
+
+
+def cartesian_rows(
+    axes: dict[str, list], start: int, stop: int
+) -> dict[str, np.ndarray]:
+    """
+    The rows start, ..., stop - 1 of cartesian(axes), without building the whole
+    product.
+    """
+    values = [np.asarray(v) for v in axes.values()]
+    positions = np.unravel_index(np.arange(start, stop), [len(v) for v in values])
+    return {name: v[p] for name, v, p in zip(axes, values, positions)}
+
+
+# state of a worker process of parallel_grid
+_worker = dict()
+
+
+def _init_worker(
+    axes: dict[str, list],
+    compute_rows: Callable,
+    memory_name: str,
+    layout: dict[str, tuple[int, str]],
+    n_rows: int,
+    stats: bool,
+):
+    """
+    Attach a worker process to the shared result buffer of parallel_grid.
+    """
+    from multiprocessing import shared_memory
+
+    memory = shared_memory.SharedMemory(name=memory_name)
+    _worker["memory"] = memory
+    _worker["axes"] = axes
+    _worker["compute_rows"] = compute_rows
+    _worker["columns"] = _views(memory.buf, layout, n_rows)
+    if stats:
+        instrument.enable()
+
+
+def _views(
+    buffer, layout: dict[str, tuple[int, str]], n_rows: int
+) -> dict[str, np.ndarray]:
+    """
+    The columns in `buffer`, where `layout` maps every column to its offset and
+    dtype.
+    """
+    return {
+        name: np.ndarray((n_rows,), dtype=dtype, buffer=buffer, offset=offset)
+        for name, (offset, dtype) in layout.items()
+    }
+
+
+def _compute_chunk(start: int, stop: int) -> dict:
+    """
+    Compute the rows start, ..., stop - 1 in a worker process and write them into
+    the shared result buffer. Returns the instrumentation data of this chunk.
+    """
+    with instrument.stage("grid: compute"):
+        chunk = _worker["compute_rows"](cartesian_rows(_worker["axes"], start, stop))
+    for name, values in chunk.items():
+        _worker["columns"][name][start:stop] = values
+    stats = instrument.snapshot()
+    instrument.reset()
+    return stats
+
+
+def parallel_grid(
+    axes: dict[str, list],
+    compute_rows: Callable[[dict[str, np.ndarray]], dict[str, np.ndarray]],
+    workers: int | None = None,
+    chunk_size: int = 250_000,
+) -> dict[str, np.ndarray]:
+    """
+    The grid of all combinations of `axes` (in the order of cartesian), computed in
+    chunks of `chunk_size` rows by a pool of `workers` processes.
+
+    `compute_rows` gets the axis columns of a chunk and returns all columns of its
+    rows (like etf_rows). It must be picklable, e.g. a module-level function or a
+    functools.partial of one. The workers write their rows directly into a shared
+    memory buffer, so no results are pickled back, and the rows are in the same
+    order for any number of workers. If the instrumentation is enabled, the data
+    of the workers is merged into this process.
+
+    By default, there is one worker per CPU, but at most one per chunk. With a
+    single worker (e.g. for grids that fit into one chunk), the chunks are computed
+    in this process, which avoids the start-up cost of the pool.
+    """
+    n_rows = int(np.prod([len(values) for values in axes.values()]))
+    n_chunks = max(1, -(-n_rows // chunk_size))
+    workers = min(workers or os.cpu_count() or 1, n_chunks)
+    if workers == 1:
+        chunks = [
+            compute_rows(cartesian_rows(axes, start, min(start + chunk_size, n_rows)))
+            for start in range(0, max(n_rows, 1), chunk_size)
+        ]
+        return {name: np.concatenate([c[name] for c in chunks]) for name in chunks[0]}
+
+    # imported here since only the process pool needs them
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import shared_memory
+    import multiprocessing
+
+    # the first row determines the columns and their types
+    first = compute_rows(cartesian_rows(axes, 0, 1))
+    layout = dict()
+    size = 0
+    for name, values in first.items():
+        dtype = np.asarray(values).dtype
+        layout[name] = (size, dtype.str)
+        # keep every column aligned to 8 bytes
+        size += -(-n_rows * dtype.itemsize // 8) * 8
+
+    memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(
+                axes,
+                compute_rows,
+                memory.name,
+                layout,
+                n_rows,
+                instrument.enabled(),
+            ),
+        ) as executor:
+            starts = range(0, n_rows, chunk_size)
+            stops = [min(start + chunk_size, n_rows) for start in starts]
+            for stats in executor.map(_compute_chunk, starts, stops):
+                instrument.merge(stats)
+        return {
+            name: values.copy()
+            for name, values in _views(memory.buf, layout, n_rows).items()
+        }
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+def etf_axes(
+    contributions: list[float],
+    start_balances: list[float],
+    rates: list[float],
+    growth_years: list[int],
+    consume_years: list[int],
+) -> dict[str, list]:
+    """
+    The axes of the table of etf.py, keyed by their column names.
+    """
+    return {
+        "contribution": contributions,
+        "start balance": start_balances,
+        "rate": rates,
+        "growth years": growth_years,
+        "consume years": consume_years,
+    }
+
+
+def etf_grid(
+    contributions: list[float],
+    start_balances: list[float],
+    rates: list[float],
+    growth_years: list[int],
+    consume_years: list[int],
+    inflation: float,
+    contributions_per_year: int = 12,
+    workers: int | None = None,
+    tax: str = "flat",
+) -> dict[str, np.ndarray]:
+    """
+    Compute the table of etf.py for all combinations of the given axes.
+
+    Each scenario grows `start balance` for `growth years` with a monthly
+    `contribution` and then consumes the end balance in `consume years`.
+    All derived columns are computed as whole-array operations, in parallel for
+    large grids (see parallel_grid). `tax` selects the tax of the net columns (see
+    etf_rows).
+
+    Returns a dictionary of columns with one entry per scenario.
+    """
+    return parallel_grid(
+        etf_axes(contributions, start_balances, rates, growth_years, consume_years),
+        functools.partial(
+            etf_rows,
+            inflation=inflation,
+            contributions_per_year=contributions_per_year,
+            tax=tax,
+        ),
+        workers=workers,
+    )
+
+
+def etf_rows(
+    t_dict: dict[str, np.ndarray],
+    inflation: float | np.ndarray,
+    contributions_per_year: int = 12,
+    tax: str = "flat",
+) -> dict[str, np.ndarray]:
+    """
+    Add the derived columns of etf.py to the rows in `t_dict`, which has the columns
+    of etf_axes. The rows need not form a Cartesian product. `inflation` is either
+    the same for all rows or a column.
+
+    With `tax` "flat", the net values subtract the flat tax of
+    utils.subtract_gains_tax. With "german", the net MPP is computed year by year
+    with tax.german_tax and the net interest is taxed as gains after the partial
+    exemption.
+    """
+    if tax not in ("flat", "german"):
+        raise ValueError(f"Unknown tax {tax!r}, use 'flat' or 'german'.")
+    c = t_dict["contribution"]
+    sb = t_dict["start balance"]
+    r = t_dict["rate"]
+    gy = t_dict["growth years"]
+    cy = t_dict["consume years"]
+
+    eb = ut.compound_interest(
+        initial_balance=sb,
+        annual_interest_rate=r,
+        regular_contribution=c,
+        contributions_per_year=contributions_per_year,
+        years=gy,
+    )
+    t_dict["end balance"] = eb
+
+    monthly_rate = ut.annual_to_monthly(r) - 1
+    interest = eb * monthly_rate
+    if tax == "flat":
+        net_interest = ut.subtract_gains_tax(interest)
+    else:
+        net_interest = interest * (1 - tx.TAX_RATE * (1 - tx.PARTIAL_EXEMPTION))
+    t_dict["net interest"] = net_interest
+    t_dict["net interest (today)"] = ut.value_today(
+        x=net_interest, years=gy, annual_rate_of_inflation=inflation
+    )
+
+    mpp = ut.monthly_purchasing_power(
+        start_balance=eb,
+        years_to_consume=cy,
+        annual_rate_of_return=r,
+        annual_rate_of_inflation=inflation,
+    )
+    if tax == "flat":
+        net_mpp = ut.subtract_gains_tax(mpp)
+    else:
+        net_mpp = tx.german_tax(
+            initial_balance=sb,
+            annual_interest_rate=r,
+            regular_contribution=c,
+            growth_years=gy,
+            consume_years=cy,
+            annual_rate_of_inflation=inflation,
+            contributions_per_year=contributions_per_year,
+            monthly_withdrawal=mpp,
+        )["net MPP"]
+    t_dict["net MPP"] = net_mpp
+    t_dict["net MPP (today)"] = ut.value_today(
+        x=net_mpp, years=gy, annual_rate_of_inflation=inflation
+    )
+    return t_dict
+
+
+def merge(
+    axes: dict[str, list],
+    old_axes: dict[str, list],
+    old_columns: dict[str, np.ndarray],
+    compute_rows: Callable[[dict[str, np.ndarray]], dict[str, np.ndarray]],
+) -> tuple[dict[str, np.ndarray], int]:
+    """
+    The grid of all combinations of `axes`, reusing a previous result.
+
+    `old_columns` is the grid of `old_axes`. Rows whose axis values all appear in
+    `old_axes` are copied from it. Only the remaining rows (those with a new axis
+    value) are passed to `compute_rows`, which gets and returns columns like
+    etf_rows.
+
+    Returns the columns and the number of computed rows.
+    """
+    shape = [len(values) for values in axes.values()]
+    old_shape = [len(old_axes[name]) for name in axes]
+    # position of every row in the new and in the old axes (-1 if the value is new)
+    positions = np.indices(shape).reshape(len(shape), -1)
+    old_positions = list()
+    for (name, values), position in zip(axes.items(), positions):
+        old_index = {value: i for i, value in enumerate(old_axes[name])}
+        lookup = np.array([old_index.get(value, -1) for value in values], dtype=int)
+        old_positions.append(lookup[position])
+    reuse = np.all([p >= 0 for p in old_positions], axis=0)
+    old_rows = np.ravel_multi_index([p[reuse] for p in old_positions], old_shape)
+
+    rows = cartesian(axes)
+    computed = compute_rows({name: values[~reuse] for name, values in rows.items()})
+    t_dict = dict()
+    for name, values in computed.items():
+        t_dict[name] = np.empty(
+            len(reuse), dtype=np.result_type(values, old_columns[name])
+        )
+        t_dict[name][reuse] = old_columns[name][old_rows]
+        t_dict[name][~reuse] = values
+    return t_dict, int(np.sum(~reuse))
@@ -0,0 +1,133 @@
+from contextlib import nullcontext
+import json
+import os
+import time
+import numpy as np
+
+# FINANCE_STATS enables the instrumentation and names the JSON file written by dump()
+_path = os.environ.get("FINANCE_STATS")
+_enabled = bool(_path)
+
+_counters = dict()
+_histograms = dict()
+_timers = dict()
+
+# upper bin edges of the residual histograms: 1e-12, 1e-11, ..., 1e4, inf
+HISTOGRAM_EDGES = [*(10.0**e for e in range(-12, 5)), np.inf]
+# shared by all stages while disabled
+_NULL_STAGE = nullcontext()
+
+
+def enable(path: str | None = None):
+    """
+    Start collecting counters, histograms and timers. `path` is the file written by
+    dump() (the environment variable FINANCE_STATS enables the instrumentation at
+    import and sets the file).
+    """
+    global _enabled, _path
+    _enabled = True
+    _path = path or _path
+
+
+def disable():
+    """
+    Stop collecting. The data collected so far is kept until reset().
+    """
+    global _enabled
+    _enabled = False
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    """
+    Forget all data collected so far.
+    """
+    _counters.clear()
+    _histograms.clear()
+    _timers.clear()
+
+
+def count(name: str, n: int = 1):
+    """
+    Add `n` to the counter `name`.
+    """
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + int(n)
+
+
+def histogram(name: str, values: float | np.ndarray):
+    """
+    Add the absolute `values` (e.g. residual errors) to the histogram `name` with
+    the decadic bins of HISTOGRAM_EDGES. NaNs are counted in the last bin.
+    """
+    if not _enabled:
+        return
+    values = np.abs(np.asarray(values, dtype=float)).ravel()
+    bins = np.searchsorted(HISTOGRAM_EDGES, np.nan_to_num(values, nan=np.inf))
+    counts = np.bincount(bins, minlength=len(HISTOGRAM_EDGES))
+    old = _histograms.get(name, [0] * len(HISTOGRAM_EDGES))
+    _histograms[name] = [a + int(b) for a, b in zip(old, counts)]
+
+
+class _Stage:
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        timer = _timers.setdefault(self.name, {"calls": 0, "seconds": 0.0})
+        timer["calls"] += 1
+        timer["seconds"] += time.perf_counter() - self.start
+
+
+def stage(name: str):
+    """
+    A context manager that adds its wall-clock time to the timer `name`.
+    """
+    return _Stage(name) if _enabled else _NULL_STAGE
+
+
+def snapshot() -> dict:
+    """
+    All data collected so far as a JSON-serializable dictionary.
+    """
+    return {
+        "counters": dict(_counters),
+        "histograms": {
+            name: {"edges": [str(e) for e in HISTOGRAM_EDGES], "counts": list(counts)}
+            for name, counts in _histograms.items()
+        },
+        "timers": {name: dict(timer) for name, timer in _timers.items()},
+    }
+
+
+def merge(other: dict):
+    """
+    Add a snapshot, e.g. from a worker process, to the data of this process.
+    """
+    for name, n in other["counters"].items():
+        _counters[name] = _counters.get(name, 0) + n
+    for name, histogram in other["histograms"].items():
+        old = _histograms.get(name, [0] * len(HISTOGRAM_EDGES))
+        _histograms[name] = [a + b for a, b in zip(old, histogram["counts"])]
+    for name, timer in other["timers"].items():
+        mine = _timers.setdefault(name, {"calls": 0, "seconds": 0.0})
+        mine["calls"] += timer["calls"]
+        mine["seconds"] += timer["seconds"]
+
+
+def dump(path: str | None = None):
+    """
+    Write snapshot() as JSON to `path` (by default the file given to enable() or in
+    FINANCE_STATS). Nothing is written while the instrumentation is disabled.
+    """
+    path = path or _path
+    if not _enabled or not path:
+        return
+    with open(path, "w", encoding="utf8") as f:
+        json.dump(snapshot(), f, indent=4)
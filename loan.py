@@ -0,0 +1,119 @@
+import numpy as np
+
+
+def _check_installment(
+    loan_balance: np.ndarray,
+    annual_interest_rate: np.ndarray,
+    regular_installment: np.ndarray,
+    installments_per_year: np.ndarray,
+):
+    """
+    Raise a ValueError if an installment does not exceed the interest of the first
+    installment period, since the loan would then never be paid off.
+    """
+    yearly_minimum = loan_balance * annual_interest_rate
+    too_small = regular_installment * installments_per_year < yearly_minimum
+    if np.any(too_small):
+        minimum = np.broadcast_to(yearly_minimum, too_small.shape)
+        raise ValueError(
+            f"You need to repay at least {minimum[too_small].max()} in the first year."
+        )
+    # the interest of one installment period
+    r = (1 + annual_interest_rate) ** (1 / installments_per_year) - 1
+    too_small = regular_installment <= r * loan_balance
+    if np.any(too_small):
+        minimum = np.broadcast_to(r * loan_balance, too_small.shape)
+        raise ValueError(
+            f"You need to repay more than {minimum[too_small].max():.2f} per installment."
+        )
+
+
+def payoff_installments(
+    loan_balance: float | np.ndarray,
+    annual_interest_rate: float | np.ndarray,
+    regular_installment: float | np.ndarray,
+    installments_per_year: int | np.ndarray,
+) -> int | np.ndarray:
+    """
+    The number of installments after which the loan is paid off, i.e., after which
+    the owed amount is negative for the first time.
+
+    With q = 1 + r the interest factor per installment, the owed amount after k
+    installments is L q^k - I (q^k - 1) / r. It is negative as soon as
+    q^k > I / (I - r L), which is solved for k with logarithms.
+
+    All arguments can be arrays. They are broadcast against each other.
+    """
+    L = np.asarray(loan_balance, dtype=float)
+    a = np.asarray(annual_interest_rate, dtype=float)
+    I = np.asarray(regular_installment, dtype=float)
+    P = np.asarray(installments_per_year)
+    _check_installment(L, a, I, P)
+
+    # x = log(q): logarithmic interest rate per installment
+    x = np.log1p(a) / P
+    r = np.expm1(x)
+    zero_rate = r == 0
+    x_safe = np.where(zero_rate, 1.0, x)
+    k = np.where(zero_rate, L / I, -np.log1p(-r * L / I) / x_safe)
+    return (np.floor(k).astype(int) + 1)[()]
+
+
+def payoff_time(
+    loan_balance: float | np.ndarray,
+    annual_interest_rate: float | np.ndarray,
+    regular_installment: float | np.ndarray,
+    installments_per_year: int | np.ndarray,
+) -> float | np.ndarray:
+    """
+    The number of months until the loan is paid off (see payoff_installments).
+    """
+    installments = payoff_installments(
+        loan_balance, annual_interest_rate, regular_installment, installments_per_year
+    )
+    return installments / np.asarray(installments_per_year) * 12
+
+
+def amortization_schedule(
+    loan_balance: float | np.ndarray,
+    annual_interest_rate: float | np.ndarray,
+    regular_installment: float | np.ndarray,
+    installments_per_year: int,
+) -> dict[str, np.ma.MaskedArray]:
+    """
+    The amortization schedules of a batch of loans.
+
+    The first three arguments can be arrays of loans. They are broadcast against each
+    other. With n the largest number of installments of all loans, the result has
+        "owed": the owed amount after k = 0, ..., n installments, shape (*loans, n + 1),
+        "interest": the interest part of installment k = 1, ..., n, shape (*loans, n),
+        "principal": the principal part of installment k = 1, ..., n, shape (*loans, n).
+    Installments after a loan is paid off are masked. As in the last installment of
+    main.rep, the final owed amount is negative.
+    """
+    L = np.asarray(loan_balance, dtype=float)
+    a = np.asarray(annual_interest_rate, dtype=float)
+    I = np.asarray(regular_installment, dtype=float)
+    n_installments = np.asarray(payoff_installments(L, a, I, installments_per_year))[
+        ..., np.newaxis
+    ]
+    L, a, I = L[..., np.newaxis], a[..., np.newaxis], I[..., np.newaxis]
+
+    k = np.arange(n_installments.max() + 1)
+    x = np.log1p(a) / installments_per_year
+    r = np.expm1(x)
+    # (q^k - 1) / r with its limit k for r = 0
+    zero_rate = r == 0
+    x_safe = np.where(zero_rate, 1.0, x)
+    # the placeholder x_safe = 1 of zero rates may overflow for long schedules
+    with np.errstate(over="ignore"):
+        series = np.where(zero_rate, k, np.expm1(k * x_safe) / np.expm1(x_safe))
+    owed = L * np.exp(k * x) - I * series
+    interest = r * owed[..., :-1]
+    principal = I - interest
+
+    return {
+        "owed": np.ma.masked_array(owed, mask=k > n_installments),
+        "interest": np.ma.masked_array(interest, mask=k[1:] > n_installments),
+        "principal": np.ma.masked_array(principal, mask=k[1:] > n_installments),
+    }
@@ -1,7 +1,14 @@
-from matplotlib import pyplot as plt
+import argparse
+import os
+import time
+import grid
+import instrument
+import loan
+import manifest
 import numpy as np
-import pandas as pd
-from tabulate import tabulate
+import plot
+import store
+import table
 import utils as ut
 
 
@@ -21,56 +28,42 @@ def ci(
         means that at the end of each month `regular_contribution` is added to
         the total balance.
 
+    The arguments `initial_balance`, `annual_interest_rate` and
+    `regular_contribution` can be arrays of scenarios. The balances after each
+    contribution are then an array of shape (*scenarios, periods + 1).
+
     Reference:
         https://www.calculator.net/investment-calculator.html
     """
-    balance = initial_balance
-    balance_after_each_contribution = [balance]
-    # convert annual interest rate to interest rate per contribution time interval (+ 1)
-    if contributions_per_year > 0:
-        r = (1 + annual_interest_rate) ** (1 / contributions_per_year)
-    else:
-        r = annual_interest_rate
-    for _ in range(years):
-        for _ in range(contributions_per_year):
-            # grow until next contribution
-            balance *= r
-            # next contribution
-            balance += regular_contribution
-
-            balance_after_each_contribution.append(balance)
-    return balance, balance_after_each_contribution
+    if contributions_per_year == 0:
+        return initial_balance, np.array([initial_balance])
+    balance_after_each_contribution = ut.compound_interest_trajectory(
+        initial_balance=initial_balance,
+        annual_interest_rate=annual_interest_rate,
+        regular_contribution=regular_contribution,
+        contributions_per_year=contributions_per_year,
+        years=years,
+    )
+    return balance_after_each_contribution[..., -1], balance_after_each_contribution
 
 
 def rep(loan_balance, annual_interest_rate, regular_installment, installments_per_year):
     """
     Calculate repayment.
 
+    Returns the number of months until the loan is paid off and the owed amount
+    after each installment (see loan.py).
+
     Reference:
         https://www.calculator.net/repayment-calculator.html
     """
-    if (
-        regular_installment * installments_per_year
-        < loan_balance * annual_interest_rate
-    ):
-        raise ValueError(
-            f"You need to repay at least {loan_balance * annual_interest_rate} in the first year."
-        )
-    installments = 0
-    owed = loan_balance
-    owed_after_each_installment = [owed]
-    # convert annual interest rate to interest rate per contribution time interval
-    r = (1 + annual_interest_rate) ** (1 / installments_per_year) - 1
-    while True:
-        for _ in range(installments_per_year):
-            installments += 1
-            interest = r * owed
-            owed -= regular_installment - interest
-
-            owed_after_each_installment.append(owed)
-            if owed < 0:
-                months = installments / installments_per_year * 12
-                return months, owed_after_each_installment
+    months = loan.payoff_time(
+        loan_balance, annual_interest_rate, regular_installment, installments_per_year
+    )
+    owed_after_each_installment = loan.amortization_schedule(
+        loan_balance, annual_interest_rate, regular_installment, installments_per_year
+    )["owed"].compressed()
+    return months, owed_after_each_installment
 
 
 def test():
@@ -143,29 +136,34 @@ def test():
     ), "Computed interest rate is not correct."
 
 
-def repay():
+def repay(store_columns: bool = False, png: bool = True):
     interest_rates = [0.02, 0.03, 0.04]
     loan_balance = 500_000
     regular_installments = [2_000, 2_500, 3_000]
     installments_per_year = 12
 
+    # amortization schedules of all rates (first axis) and installments (second axis)
+    owed = loan.amortization_schedule(
+        loan_balance=loan_balance,
+        annual_interest_rate=np.array(interest_rates)[:, np.newaxis],
+        regular_installment=np.array(regular_installments)[np.newaxis, :],
+        installments_per_year=installments_per_year,
+    )["owed"]
+
     # dictionary to print a table in the end
     t_dict = {"year": list(), "rate": list(), "installment": list(), "owed": list()}
-    for rate in interest_rates:
-        for installment in regular_installments:
-            y_axis = rep(
-                loan_balance=loan_balance,
-                annual_interest_rate=rate,
-                regular_installment=installment,
-                installments_per_year=installments_per_year,
-            )[1]
+    # curves of the plot (they differ in length)
+    x_axes, y_axes, labels = list(), list(), list()
+    for i, rate in enumerate(interest_rates):
+        for j, installment in enumerate(regular_installments):
+            y_axis = owed[i, j].compressed()
             # only the 12th month of every year and the last month
-            y_axis = [*y_axis[::12], y_axis[-1]]
+            y_axis = np.append(y_axis[::12], y_axis[-1])
 
             years = len(y_axis)
-            x_axis = [x for x in range(1, years + 1)]
+            x_axis = np.arange(1, years + 1)
             # convert to k€
-            y_axis = [y / 1e3 for y in y_axis]
+            y_axis = y_axis / 1e3
 
             # for table
             t_dict["year"].extend(x_axis)
@@ -174,24 +172,31 @@ def repay():
             t_dict["owed"].extend(y_axis)
 
             # for plot
-            plt.plot(x_axis, y_axis, label=f"rate = {rate}, inst. = {installment}")
+            x_axes.append(x_axis)
+            y_axes.append(y_axis)
+            labels.append(f"rate = {rate}, inst. = {installment}")
 
     # for table
-    with open("house.txt", "w", encoding="utf8") as f:
-        df = pd.DataFrame(t_dict)
-        table = tabulate(df, headers="keys", tablefmt="psql", showindex=False)
-        f.write(table)
+    if store_columns:
+        store.save_columns("house.columns", t_dict)
+    with instrument.stage("repay: table"), open("house.txt", "w", encoding="utf8") as f:
+        table.write_table(
+            f,
+            t_dict,
+            formats={"rate": "{:g}", "owed": "{:g}"},
+            tablefmt="psql",
+            align="decimal",
+        )
 
     # for plot
-    plt.legend()
-    plt.xlabel("years")
-    plt.ylabel("k€")
-    plt.title("House")
-    plt.savefig("house.png")
-    plt.close()
+    if png:
+        with instrument.stage("repay: plot"):
+            fig, ax = plot.figure(1, "House")
+            plot.curves(ax[0], x_axes, y_axes, labels)
+            plot.save(fig, "house")
 
 
-def etf_growth():
+def etf_growth(store_columns: bool = False, png: bool = True):
     interest_rates = [0.05, 0.06, 0.065, 0.07, 0.075]
     initial_balance = 100_000
     regular_contributions = [2_000, 2_500, 3_000]
@@ -199,65 +204,61 @@ def etf_growth():
     years = 40
     filename = "etf_growth"
 
-    x_axis = [x for x in range(years + 1)]
-    # dictionary to print a table in the end
-    t_dict = {"year": list(), "rate": list(), "contribution": list(), "balance": list()}
-
-    fig, ax = plt.subplots(2, 1)
-    for rate in interest_rates:
-        for contribution in regular_contributions:
-            y_axis = ci(
-                initial_balance=initial_balance,
-                annual_interest_rate=rate,
-                regular_contribution=contribution,
-                contributions_per_year=contributions_per_year,
-                years=years,
-            )[1]
-
-            # only the initial investment and the 12th month of every year
-            y_axis = [y_axis[0], *y_axis[12::12]]
-            # convert to k€
-            y_axis = [y / 1e3 for y in y_axis]
-
-            # for table
-            t_dict["year"].extend(x_axis)
-            t_dict["rate"].extend([rate] * (years + 1))
-            t_dict["contribution"].extend([contribution] * (years + 1))
-            t_dict["balance"].extend(y_axis)
+    x_axis = np.arange(years + 1)
+    # all rates (first axis) and contributions (second axis) in one call
+    y_axis = ci(
+        initial_balance=initial_balance,
+        annual_interest_rate=np.array(interest_rates)[:, np.newaxis],
+        regular_contribution=np.array(regular_contributions)[np.newaxis, :],
+        contributions_per_year=contributions_per_year,
+        years=years,
+    )[1]
+    # only the initial investment and the 12th month of every year
+    y_axis = y_axis[..., ::contributions_per_year]
+    # convert to k€
+    y_axis = y_axis / 1e3
 
-            # for plot
-            ax[0].plot(
-                x_axis[:26],
-                y_axis[:26],
-                label=f"r = {rate * 100:.1f}%, c = {contribution / 1e3:.1f}k€",
-            )
-            ax[1].plot(
-                x_axis[26:],
-                y_axis[26:],
-                label=f"r = {rate * 100:.1f}%, c = {contribution / 1e3:.1f}k€",
-            )
+    # dictionary to print a table in the end
+    rows = grid.cartesian(
+        {"rate": interest_rates, "contribution": regular_contributions, "year": x_axis}
+    )
+    t_dict = {
+        "year": rows["year"],
+        "rate": rows["rate"],
+        "contribution": rows["contribution"],
+        "balance": y_axis.ravel(),
+    }
 
     # for table
-    with open(filename + ".txt", "w", encoding="utf8") as f:
-        df = pd.DataFrame(t_dict)
-        table = tabulate(df, headers="keys", tablefmt="psql", showindex=False)
-        f.write(table)
-
-    fig.suptitle("ETF growth")
-    ax[0].set(ylabel="k€")
-    ax[0].grid(which="major", linestyle="-")
-    ax[0].grid(which="minor", linestyle="--")
-    ax[0].minorticks_on()
-    ax[1].legend(bbox_to_anchor=(1.04, 0), loc="lower left")
-    ax[1].set(xlabel="years", ylabel="k€")
-    ax[1].grid(which="major", linestyle="-")
-    ax[1].grid(which="minor", linestyle="--")
-    ax[1].minorticks_on()
-    fig.savefig(filename + ".png", bbox_inches="tight")
-    plt.close()
-
-
-def house_growth():
+    if store_columns:
+        store.save_columns(filename + ".columns", t_dict)
+    with instrument.stage("etf_growth: table"), open(
+        filename + ".txt", "w", encoding="utf8"
+    ) as f:
+        table.write_table(
+            f,
+            t_dict,
+            formats={"rate": "{:g}", "balance": "{:g}"},
+            tablefmt="psql",
+            align="decimal",
+        )
+
+    # for plot: the first 25 years and the remaining years in separate panels
+    if png:
+        labels = [
+            f"r = {rate * 100:.1f}%, c = {contribution / 1e3:.1f}k€"
+            for rate in interest_rates
+            for contribution in regular_contributions
+        ]
+        curves = y_axis.reshape(-1, years + 1)
+        with instrument.stage("etf_growth: plot"):
+            fig, ax = plot.figure(2, "ETF growth")
+            plot.curves(ax[0], x_axis[:26], curves[:, :26])
+            plot.curves(ax[1], x_axis[26:], curves[:, 26:], labels)
+            plot.save(fig, filename)
+
+
+def house_growth(store_columns: bool = False, png: bool = True):
     interest_rates = [0.02, 0.03, 0.04, 0.05, 0.08]
     initial_balances = [500_000, 650_000, 800_000]
     regular_contribution = 0
@@ -265,71 +266,92 @@ def house_growth():
     years = 40
     filename = "house_growth"
 
-    x_axis = [x for x in range(years + 1)]
+    x_axis = np.arange(years + 1)
+    # all rates (first axis) and initial balances (second axis) in one call
+    y_axis = ci(
+        initial_balance=np.array(initial_balances)[np.newaxis, :],
+        annual_interest_rate=np.array(interest_rates)[:, np.newaxis],
+        regular_contribution=regular_contribution,
+        contributions_per_year=contributions_per_year,
+        years=years,
+    )[1]
+    # convert to k€
+    y_axis = y_axis / 1e3
+
     # dictionary to print a table in the end
+    rows = grid.cartesian(
+        {"rate": interest_rates, "initial_balance": initial_balances, "year": x_axis}
+    )
     t_dict = {
-        "year": list(),
-        "rate": list(),
-        "initial_balance": list(),
-        "balance": list(),
+        "year": rows["year"],
+        "rate": rows["rate"],
+        "initial_balance": rows["initial_balance"],
+        "balance": y_axis.ravel(),
     }
 
-    fig, ax = plt.subplots(2, 1)
-    for rate in interest_rates:
-        for initial_balance in initial_balances:
-            y_axis = ci(
-                initial_balance=initial_balance,
-                annual_interest_rate=rate,
-                regular_contribution=regular_contribution,
-                contributions_per_year=contributions_per_year,
-                years=years,
-            )[1]
-
-            # convert to k€
-            y_axis = [y / 1e3 for y in y_axis]
+    # for table
+    if store_columns:
+        store.save_columns(filename + ".columns", t_dict)
+    with instrument.stage("house_growth: table"), open(
+        filename + ".txt", "w", encoding="utf8"
+    ) as f:
+        table.write_table(
+            f,
+            t_dict,
+            formats={"rate": "{:g}", "balance": "{:g}"},
+            tablefmt="psql",
+            align="decimal",
+        )
 
-            # for table
-            t_dict["year"].extend(x_axis)
-            t_dict["rate"].extend([rate] * (years + 1))
-            t_dict["initial_balance"].extend([initial_balance] * (years + 1))
-            t_dict["balance"].extend(y_axis)
+    # for plot: the first 25 years and the remaining years in separate panels
+    if png:
+        labels = [
+            f"r = {rate * 100:.1f}%, p = {initial_balance / 1e3:.0f}k€"
+            for rate in interest_rates
+            for initial_balance in initial_balances
+        ]
+        curves = y_axis.reshape(-1, years + 1)
+        with instrument.stage("house_growth: plot"):
+            fig, ax = plot.figure(2, "House growth")
+            plot.curves(ax[0], x_axis[:26], curves[:, :26])
+            plot.curves(ax[1], x_axis[26:], curves[:, 26:], labels)
+            plot.save(fig, filename)
+
+
+def _func1_rows(rows: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """
+    The final house value after 25 years and the ETF interest rate needed to reach
+    it from 100k€ with the given monthly contribution, for the rows of func1.
+    """
+    final_house_value = ut.compound_interest(
+        initial_balance=rows["initial house value"],
+        annual_interest_rate=rows["house interest rate"],
+        regular_contribution=0,
+        contributions_per_year=1,
+        years=25,
+    )
+    etf_rate, error = ut.compound_interest_rate_batch(
+        initial_balance=100_000,
+        final_balance=final_house_value,
+        regular_contribution=rows["etf contribution"],
+        contributions_per_year=12,
+        years=25,
+    )
+    return {
+        **rows,
+        "final house value": final_house_value,
+        "etf interest rate": etf_rate,
+        "balance error": error,
+    }
 
-            # for plot
-            ax[0].plot(
-                x_axis[:26],
-                y_axis[:26],
-                label=f"r = {rate * 100:.1f}%, p = {initial_balance / 1e3:.0f}k€",
-            )
-            ax[1].plot(
-                x_axis[26:],
-                y_axis[26:],
-                label=f"r = {rate * 100:.1f}%, p = {initial_balance / 1e3:.0f}k€",
-            )
 
-    # for table
-    with open(filename + ".txt", "w", encoding="utf8") as f:
-        df = pd.DataFrame(t_dict)
-        table = tabulate(df, headers="keys", tablefmt="psql", showindex=False)
-        f.write(table)
-
-    fig.suptitle("House growth")
-    ax[0].set(ylabel="k€")
-    ax[0].grid(which="major", linestyle="-")
-    ax[0].grid(which="minor", linestyle="--")
-    ax[0].minorticks_on()
-    ax[1].legend(bbox_to_anchor=(1.04, 0), loc="lower left")
-    ax[1].set(xlabel="years", ylabel="k€")
-    ax[1].grid(which="major", linestyle="-")
-    ax[1].grid(which="minor", linestyle="--")
-    ax[1].minorticks_on()
-    fig.savefig(filename + ".png", bbox_inches="tight")
-    plt.close()
-
-
-def func1():
+def func1(store_columns: bool = False, workers: int | None = None):
     """
     Assuming a house's value grows for 25 years with a given annual interest
     rate, what ETF interest rate is needed to reach a comparable final balance.
+
+    The rates are solved for all rows at once, split across `workers` processes
+    for large grids (see grid.parallel_grid).
     """
     annual_interest_rates = [0.01 * x for x in range(1, 11)]
     initial_house_values = [500_000, 600_000, 700_000, 800_000]
@@ -338,65 +360,213 @@ def func1():
 
     filename = "house_growth_vs_etf_interest_rate"
 
+    # all combinations, in parallel for large grids
+    rows = grid.parallel_grid(
+        {
+            "etf contribution": regular_etf_contributions,
+            "initial house value": initial_house_values,
+            "house interest rate": annual_interest_rates,
+        },
+        _func1_rows,
+        workers=workers,
+    )
+    etf_rates = rows["etf interest rate"] * 100
+    errors = rows["balance error"]
+
     t_dict = {
-        "initial house value (k€)": list(),
-        "house interest rate (%)": list(),
-        "final house value (k€)": list(),
-        "etf contribution": list(),
-        "etf interest rate (%)": list(),
+        "initial house value (k€)": rows["initial house value"] / 1e3,
+        "house interest rate (%)": np.round(rows["house interest rate"] * 100, 1),
+        "final house value (k€)": rows["final house value"] / 1e3,
+        "etf contribution": rows["etf contribution"],
+        "etf interest rate (%)": [
+            (
+                f"{round(rate, 1):g}"
+                if error < 1e-2
+                else f"{rate:2.5f} (err: {error / 1e3:.2e} k€)"
+            )
+            for rate, error in zip(etf_rates.tolist(), errors.tolist())
+        ],
     }
 
-    for c in regular_etf_contributions:
-        for v in initial_house_values:
-            for p in annual_interest_rates:
-                #
-                # house
-                #
-                final_house_value = ut.compound_interest(
-                    initial_balance=v,
-                    annual_interest_rate=p,
-                    regular_contribution=0,
-                    contributions_per_year=1,
-                    years=25,
-                )
-
-                t_dict["initial house value (k€)"].append(v / 1e3)
-                t_dict["house interest rate (%)"].append(f"{p * 100:2.1f}")
-                t_dict["final house value (k€)"].append(final_house_value / 1e3)
-
-                #
-                # ETF
-                #
-                etf_rate, error = ut.compound_interest_rate(
-                    initial_balance=100_000,
-                    final_balance=final_house_value,
-                    regular_contribution=c,
-                    contributions_per_year=12,
-                    years=25,
-                )
-
-                t_dict["etf contribution"].append(c)
-                if error < 1e-2:
-                    t_dict["etf interest rate (%)"].append(f"{etf_rate * 100:2.1f}")
-                else:
-                    t_dict["etf interest rate (%)"].append(
-                        f"{etf_rate * 100:2.5f} (err: {error / 1e3:.2e} k€)"
-                    )
-
     # for table
-    with open(filename + ".txt", "w", encoding="utf8") as f:
-        df = pd.DataFrame(t_dict)
-        table = tabulate(df, headers="keys", tablefmt="psql", showindex=False)
-        f.write(table)
+    if store_columns:
+        store.save_columns(
+            filename + ".columns",
+            {**t_dict, "etf interest rate (%)": etf_rates, "balance error": errors},
+        )
+    with instrument.stage("func1: table"), open(
+        filename + ".txt", "w", encoding="utf8"
+    ) as f:
+        table.write_table(
+            f,
+            t_dict,
+            formats={
+                "initial house value (k€)": "{:g}",
+                "house interest rate (%)": "{:g}",
+                "final house value (k€)": "{:g}",
+            },
+            tablefmt="psql",
+            align="decimal",
+        )
 
 
-def main():
-    # repay()
-    # etf_growth()
-    # house_growth()
-    func1()
+# reports that can be selected on the command line
+REPORTS = {
+    "repay": repay,
+    "etf_growth": etf_growth,
+    "house_growth": house_growth,
+    "func1": func1,
+}
+# files written by each report (without the numeric columns of store_columns)
+REPORT_OUTPUTS = {
+    "repay": ["house.txt", "house.png"],
+    "etf_growth": ["etf_growth.txt", "etf_growth.png"],
+    "house_growth": ["house_growth.txt", "house_growth.png"],
+    "func1": ["house_growth_vs_etf_interest_rate.txt"],
+}
+# reports that plot their results
+PLOTS = ["repay", "etf_growth", "house_growth"]
+
+
+def _report_state(
+    name: str, store_columns: bool, png: bool
+) -> tuple[dict, str, list[str]]:
+    """
+    The parameters, the code version and the outputs of the report `name` for the
+    manifest (see manifest.py). The parameters of a report are part of its code.
+    """
+    params = {"store_columns": store_columns, "png": png}
+    code = manifest.code_version(
+        REPORTS[name], _func1_rows, ci, rep, grid, loan, plot, store, table, ut
+    )
+    outputs = REPORT_OUTPUTS[name]
+    if not png:
+        outputs = [output for output in outputs if not output.endswith(".png")]
+    if store_columns:
+        outputs = outputs + [os.path.splitext(outputs[0])[0] + ".columns"]
+    return params, code, outputs
+
+
+def _run_report(
+    name: str, store_columns: bool, png: bool, stats: bool
+) -> tuple[float, dict | None]:
+    """
+    Run the report `name` and return its wall-clock time in seconds and, if `stats`
+    is set, the instrumentation data of the report (see instrument.py).
+    """
+    if stats:
+        instrument.enable()
+        instrument.reset()
+    start = time.perf_counter()
+    kwargs = {"store_columns": store_columns}
+    if name in PLOTS:
+        kwargs["png"] = png
+    with instrument.stage(f"{name}: total"):
+        REPORTS[name](**kwargs)
+    seconds = time.perf_counter() - start
+    return seconds, instrument.snapshot() if stats else None
+
+
+def main(
+    names: list[str] | None = None,
+    workers: int | None = None,
+    store_columns: bool = False,
+    force: bool = False,
+    png: bool = True,
+):
+    """
+    Run the reports `names` (all by default) concurrently in a pool of `workers`
+    processes and print the wall-clock time of each report.
+
+    Reports whose code and parameters did not change since their outputs were
+    generated are skipped, unless `force` is set. Without `png`, no figures are
+    rendered. If the instrumentation is enabled (see instrument.py), the data of all
+    reports is collected in this process.
+    """
+    # imported here since only the report runner needs them
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    import multiprocessing
+
+    names = names or list(REPORTS)
+    states = {name: _report_state(name, store_columns, png) for name in names}
+    if not force:
+        for name in list(names):
+            params, code, _ = states[name]
+            if manifest.is_up_to_date(name, params, code):
+                print(f"{name:>12}: up to date")
+                names.remove(name)
+    if not names:
+        return
+    workers = workers or min(len(names), os.cpu_count() or 1)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        futures = {
+            executor.submit(
+                _run_report, name, store_columns, png, instrument.enabled()
+            ): name
+            for name in names
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            seconds, stats = future.result()
+            print(f"{name:>12}: {seconds:.2f} s")
+            if stats is not None:
+                instrument.merge(stats)
+            params, code, outputs = states[name]
+            manifest.record(name, params, code, outputs)
+    print(f"{'total':>12}: {time.perf_counter() - start:.2f} s ({workers} workers)")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the reports.")
+    parser.add_argument(
+        "reports",
+        nargs="*",
+        help=f"reports to generate: {', '.join(REPORTS)} (default: all)",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        help="number of processes (default: one per report and CPU)",
+    )
+    parser.add_argument(
+        "--columns",
+        action="store_true",
+        help="also store the numeric columns of each table (see store.py)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="regenerate reports even if they are up to date",
+    )
+    parser.add_argument(
+        "--no-png",
+        action="store_true",
+        help="only write the tables, without rendering the figures",
+    )
+    parser.add_argument(
+        "--stats",
+        metavar="FILE",
+        help="write solver counters and stage timers to FILE as JSON",
+    )
+    args = parser.parse_args()
+    for name in args.reports:
+        if name not in REPORTS:
+            parser.error(f"unknown report {name!r}")
+    if args.stats:
+        instrument.enable(args.stats)
+
     test()
-    main()
+    main(
+        names=args.reports,
+        workers=args.workers,
+        store_columns=args.columns,
+        force=args.force,
+        png=not args.no_png,
+    )
+    instrument.dump()
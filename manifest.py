@@ -0,0 +1,71 @@
+from types import ModuleType
+from typing import Callable
+import hashlib
+import inspect
+import json
+import os
+
+MANIFEST_FILE = ".manifest.json"
+
+
+def fingerprint(params: dict) -> str:
+    """
+    A hash of JSON-serializable parameters (independent of the order of the keys).
+    """
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def code_version(*sources: ModuleType | Callable) -> str:
+    """
+    A hash of the source code of the given modules or functions.
+    """
+    digest = hashlib.sha256()
+    for source in sources:
+        digest.update(inspect.getsource(source).encode())
+    return digest.hexdigest()
+
+
+def load(path: str = MANIFEST_FILE) -> dict[str, dict]:
+    """
+    The manifest: for every report its parameters, their hash, the code version and
+    the generated outputs.
+    """
+    if not os.path.exists(path):
+        return dict()
+    with open(path, encoding="utf8") as f:
+        return json.load(f)
+
+
+def is_up_to_date(
+    name: str, params: dict, code: str, path: str = MANIFEST_FILE
+) -> bool:
+    """
+    Whether the report `name` was generated with the same parameters and code and all
+    of its outputs still exist.
+    """
+    entry = load(path).get(name)
+    return (
+        entry is not None
+        and entry["params_hash"] == fingerprint(params)
+        and entry["code"] == code
+        and all(os.path.exists(output) for output in entry["outputs"])
+    )
+
+
+def record(
+    name: str, params: dict, code: str, outputs: list[str], path: str = MANIFEST_FILE
+):
+    """
+    Record that the report `name` generated `outputs` with `params` and `code`.
+    """
+    manifest = load(path)
+    manifest[name] = {
+        "params": params,
+        "params_hash": fingerprint(params),
+        "code": code,
+        "outputs": outputs,
+    }
+    # write to a temporary file first so that the manifest is never half written
+    with open(path + ".tmp", "w", encoding="utf8") as f:
+        json.dump(manifest, f, indent=4, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
@@ -0,0 +1,162 @@
+import numpy as np
+import utils as ut
+
+
+def _monthly_log_growth(
+    rng: np.random.Generator,
+    shape: tuple[int, int],
+    annual_return: float,
+    annual_volatility: float,
+    distribution: str,
+) -> np.ndarray:
+    """
+    Draw monthly logarithmic growth factors log(1 + monthly return).
+
+    "lognormal": the annual growth factor is lognormal with mean 1 + annual_return
+    and standard deviation annual_volatility; it is split into twelve i.i.d. months.
+    "normal": the monthly return is normal with mean (1 + annual_return)^(1/12) - 1
+    and standard deviation annual_volatility / sqrt(12). Monthly losses of 100% or more
+    are clipped to a (nearly) total loss.
+    """
+    z = rng.standard_normal(shape)
+    if distribution == "lognormal":
+        var = np.log1p((annual_volatility / (1 + annual_return)) ** 2)
+        mean = np.log1p(annual_return) - var / 2
+        return mean / 12 + np.sqrt(var / 12) * z
+    elif distribution == "normal":
+        monthly = ut.annual_to_monthly(annual_return) - 1
+        growth = 1 + monthly + annual_volatility / np.sqrt(12) * z
+        return np.log(np.maximum(growth, 1e-12))
+    raise ValueError(
+        f"Unknown distribution {distribution!r}. Use 'lognormal' or 'normal'."
+    )
+
+
+def simulate(
+    initial_balance: float,
+    regular_contribution: float,
+    growth_years: int,
+    consume_years: int,
+    annual_return: float,
+    annual_volatility: float,
+    annual_rate_of_inflation: float,
+    monthly_withdrawal: float | None = None,
+    n_paths: int = 10_000,
+    distribution: str = "lognormal",
+    seed: int | None = None,
+    chunk_size: int = 4_096,
+) -> dict[str, np.ndarray]:
+    """
+    Simulate `n_paths` random return paths of the accumulation and the decumulation
+    phase of a single scenario.
+
+    During the growth years, the balance grows with the monthly return and then
+    `regular_contribution` is added (as in compound_interest with 12 contributions
+    per year). During the consume years, an inflation-indexed amount is taken out at
+    the beginning of each month and the rest grows (as in monthly_purchasing_power).
+    By default, the first withdrawal is the monthly purchasing power of the
+    deterministic end balance at `annual_return`.
+
+    With G_t the cumulative growth factor, both phases are evaluated in closed form:
+        end balance = G_T (K_0 + m sum_{t=1}^{T} 1 / G_t),
+        final balance = G'_K (end balance - sum_{s=1}^{K} w_s / G'_{s-1}).
+    The paths are processed in chunks of `chunk_size`, so memory is bounded by
+    chunk_size * months. For a fixed seed, the result does not depend on chunk_size.
+
+    Returns per path:
+        "end balance": the balance after the growth years,
+        "final balance": the balance after the consume years (negative if depleted),
+        "depleted": whether the withdrawals exceeded the balance at some point.
+    """
+    T = 12 * growth_years
+    K = 12 * consume_years
+    if monthly_withdrawal is None:
+        monthly_withdrawal = ut.monthly_purchasing_power(
+            start_balance=ut.compound_interest(
+                initial_balance, annual_return, regular_contribution, 12, growth_years
+            ),
+            years_to_consume=consume_years,
+            annual_rate_of_return=annual_return,
+            annual_rate_of_inflation=annual_rate_of_inflation,
+        )
+    # withdrawals w_s = w q^(s - 1) for s = 1, ..., K
+    withdrawals = monthly_withdrawal * ut.annual_to_monthly(
+        annual_rate_of_inflation
+    ) ** np.arange(K)
+
+    rng = np.random.default_rng(seed)
+    result = {
+        "end balance": np.empty(n_paths),
+        "final balance": np.empty(n_paths),
+        "depleted": np.empty(n_paths, dtype=bool),
+    }
+    for start in range(0, n_paths, chunk_size):
+        stop = min(start + chunk_size, n_paths)
+        log_growth = _monthly_log_growth(
+            rng, (stop - start, T + K), annual_return, annual_volatility, distribution
+        )
+
+        # accumulation
+        cum_growth = np.cumsum(log_growth[:, :T], axis=1)
+        log_G_T = cum_growth[:, -1] if T > 0 else 0.0
+        end_balance = np.exp(log_G_T) * (
+            initial_balance + regular_contribution * np.exp(-cum_growth).sum(axis=1)
+        )
+
+        # decumulation: cumulative growth before each withdrawal
+        cum_growth = np.cumsum(log_growth[:, T:], axis=1)
+        before = np.hstack([np.zeros((stop - start, 1)), cum_growth[:, :-1]])
+        discounted = (withdrawals * np.exp(-before)).sum(axis=1)
+        log_G_K = cum_growth[:, -1] if K > 0 else 0.0
+
+        remaining = end_balance - discounted
+        result["end balance"][start:stop] = end_balance
+        result["final balance"][start:stop] = np.exp(log_G_K) * remaining
+        # more than a cent short (ignores rounding errors of exactly planned paths)
+        result["depleted"][start:stop] = remaining < -1e-2
+    return result
+
+
+def summarize_grid(
+    columns: dict[str, np.ndarray],
+    annual_volatility: float,
+    inflation: float,
+    percentiles: tuple[float, ...] = (5, 50, 95),
+    contributions_per_year: int = 12,
+    **kwargs,
+) -> dict[str, np.ndarray]:
+    """
+    Run `simulate` for every row of a grid from grid.etf_grid and summarize the paths.
+
+    The rate of every row is used as the mean annual return. Every row uses the same
+    seed (if given in `kwargs`), so differences between rows are not due to different
+    random draws. Further keyword arguments are passed to `simulate`.
+
+    Returns the columns
+        "end balance p<q>": percentiles of the end balance,
+        "final balance p<q>": percentiles of the balance after the consume years,
+        "depletion probability": fraction of paths that run out during consumption.
+    """
+    if contributions_per_year != 12:
+        raise ValueError("The simulation uses monthly contributions.")
+    n_rows = len(columns["rate"])
+    summary = {f"end balance p{q:g}": np.empty(n_rows) for q in percentiles}
+    summary |= {f"final balance p{q:g}": np.empty(n_rows) for q in percentiles}
+    summary["depletion probability"] = np.empty(n_rows)
+    for row in range(n_rows):
+        paths = simulate(
+            initial_balance=columns["start balance"][row],
+            regular_contribution=columns["contribution"][row],
+            growth_years=columns["growth years"][row],
+            consume_years=columns["consume years"][row],
+            annual_return=columns["rate"][row],
+            annual_volatility=annual_volatility,
+            annual_rate_of_inflation=inflation,
+            **kwargs,
+        )
+        for name in ["end balance", "final balance"]:
+            values = np.percentile(paths[name], percentiles)
+            for q, value in zip(percentiles, values):
+                summary[f"{name} p{q:g}"][row] = value
+        summary["depletion probability"][row] = paths["depleted"].mean()
+    return summary
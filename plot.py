@@ -0,0 +1,77 @@
+import numpy as np
+
+# figures with one or more panels, created once per process and reused by all reports
+_templates = dict()
+# larger legends take longer to render than all the curves
+MAX_LEGEND_ENTRIES = 30
+
+
+def figure(n_panels: int, title: str, xlabel: str = "years", ylabel: str = "k€"):
+    """
+    A figure with `n_panels` axes below each other, without any curves.
+
+    The figure and its axes (grids, minor ticks, labels) are set up only once per
+    process and then cleared for every report. The figure is not managed by pyplot,
+    so it always renders with the non-interactive Agg canvas.
+
+    Returns the figure and the array of axes.
+    """
+    # imported here since matplotlib is slow to import
+    from matplotlib.figure import Figure
+
+    if n_panels not in _templates:
+        fig = Figure(figsize=(9, 4.8))
+        axes = fig.subplots(n_panels, 1, squeeze=False)[:, 0]
+        for ax in axes:
+            ax.set(ylabel=ylabel)
+            ax.grid(which="major", linestyle="-")
+            ax.grid(which="minor", linestyle="--")
+            ax.minorticks_on()
+        axes[-1].set(xlabel=xlabel)
+        # room for the legend on the right
+        fig.subplots_adjust(right=0.7)
+        _templates[n_panels] = fig, axes
+
+    fig, axes = _templates[n_panels]
+    for ax in axes:
+        for artist in [*ax.collections, *ax.lines]:
+            artist.remove()
+        if ax.get_legend() is not None:
+            ax.get_legend().remove()
+        # forget the data limits of the removed curves
+        ax.relim()
+    fig.suptitle(title)
+    return fig, axes
+
+
+def curves(ax, x: np.ndarray | list, ys: np.ndarray | list, labels: list[str] = None):
+    """
+    Draw all curves `ys` (curves along the first axis) over `x` as a single artist.
+
+    `x` is either shared by all curves or one array per curve, in which case the
+    curves can have different lengths. The colors follow the default color cycle.
+    A legend is added next to the axes if there are at most MAX_LEGEND_ENTRIES labels.
+    """
+    from matplotlib import rcParams
+    from matplotlib.collections import LineCollection
+    from matplotlib.lines import Line2D
+
+    if isinstance(ys, np.ndarray) and np.ndim(x) == 1:
+        segments = np.stack(np.broadcast_arrays(x, ys), axis=-1)
+    else:
+        segments = [np.column_stack([xi, yi]) for xi, yi in zip(x, ys)]
+    cycle = rcParams["axes.prop_cycle"].by_key()["color"]
+    colors = [cycle[i % len(cycle)] for i in range(len(segments))]
+    ax.add_collection(LineCollection(segments, colors=colors))
+    ax.autoscale_view()
+
+    if labels is not None and len(labels) <= MAX_LEGEND_ENTRIES:
+        handles = [Line2D([], [], color=c, label=l) for c, l in zip(colors, labels)]
+        ax.legend(handles=handles, bbox_to_anchor=(1.04, 0), loc="lower left")
+
+
+def save(fig, filename: str):
+    """
+    Save the figure as `filename`.png.
+    """
+    fig.savefig(filename + ".png")
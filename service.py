@@ -0,0 +1,294 @@
+from collections import OrderedDict
+from typing import Callable
+import argparse
+import asyncio
+import json
+import numpy as np
+import cache
+import loan
+import utils as ut
+
+
+def _compound_interest(args: dict[str, np.ndarray]) -> list:
+    return ut.compound_interest(**args).tolist()
+
+
+def _compound_interest_rate(args: dict[str, np.ndarray]) -> list:
+    rates, errors = ut.compound_interest_rate_batch(**args)
+    return [
+        {"rate": rate, "error": error}
+        for rate, error in zip(rates.tolist(), errors.tolist())
+    ]
+
+
+def _monthly_purchasing_power(args: dict[str, np.ndarray]) -> list:
+    return ut.monthly_purchasing_power(**args).tolist()
+
+
+def _value_today(args: dict[str, np.ndarray]) -> list:
+    return ut.value_today(**args).tolist()
+
+
+def _rep(args: dict[str, np.ndarray]) -> list:
+    """
+    The repayment of main.rep: the months until the loan is paid off and the owed
+    amount after each installment.
+    """
+    months = loan.payoff_time(**args).tolist()
+    owed = [None] * len(months)
+    # the schedules are batched per number of installments per year
+    for P in np.unique(args["installments_per_year"]):
+        rows = np.flatnonzero(args["installments_per_year"] == P)
+        schedules = loan.amortization_schedule(
+            args["loan_balance"][rows],
+            args["annual_interest_rate"][rows],
+            args["regular_installment"][rows],
+            int(P),
+        )["owed"]
+        for row, schedule in zip(rows, schedules):
+            owed[row] = schedule.compressed().tolist()
+    return [{"months": m, "owed": o} for m, o in zip(months, owed)]
+
+
+# path: (parameters, vectorized evaluation of a batch of requests)
+ENDPOINTS = {
+    "/compound_interest": (
+        [
+            "initial_balance",
+            "annual_interest_rate",
+            "regular_contribution",
+            "contributions_per_year",
+            "years",
+        ],
+        _compound_interest,
+    ),
+    "/compound_interest_rate": (
+        [
+            "initial_balance",
+            "final_balance",
+            "regular_contribution",
+            "contributions_per_year",
+            "years",
+        ],
+        _compound_interest_rate,
+    ),
+    "/monthly_purchasing_power": (
+        [
+            "start_balance",
+            "years_to_consume",
+            "annual_rate_of_return",
+            "annual_rate_of_inflation",
+        ],
+        _monthly_purchasing_power,
+    ),
+    "/value_today": (["x", "years", "annual_rate_of_inflation"], _value_today),
+    "/rep": (
+        [
+            "loan_balance",
+            "annual_interest_rate",
+            "regular_installment",
+            "installments_per_year",
+        ],
+        _rep,
+    ),
+}
+
+
+class _Batcher:
+    """
+    Collects the requests of one endpoint that arrive within `window` seconds and
+    evaluates them in one vectorized call.
+    """
+
+    def __init__(
+        self,
+        parameters: list[str],
+        evaluate: Callable[[dict[str, np.ndarray]], list],
+        window: float,
+        max_batch: int,
+    ):
+        self.parameters = parameters
+        self.evaluate = evaluate
+        self.window = window
+        self.max_batch = max_batch
+        self.pending = list()
+        self.timer = None
+        self.batches = 0
+
+    async def submit(self, args: dict) -> object:
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((args, future))
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+        return await future
+
+    def _columns(self, batch: list) -> dict[str, np.ndarray]:
+        # integer arguments (e.g. years) stay integers
+        return {
+            name: np.array([args[name] for args, _ in batch])
+            for name in self.parameters
+        }
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, list()
+        if not batch:
+            return
+        self.batches += 1
+        try:
+            results = self.evaluate(self._columns(batch))
+        except Exception:
+            # a single invalid request fails the whole batch: evaluate one by one to
+            # report the error to the request that caused it
+            for item in batch:
+                try:
+                    item[1].set_result(self.evaluate(self._columns([item]))[0])
+                except Exception as error:
+                    item[1].set_exception(error)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+class Service:
+    """
+    A local HTTP/JSON service for the formulas in ENDPOINTS.
+
+    Every endpoint takes a POST request with a JSON object of the arguments of the
+    corresponding function and returns {"result": ...}. Concurrent requests are
+    collected for `window` seconds (or until `max_batch` requests) and evaluated in
+    one vectorized call. Results are kept in an LRU of `cache_size` entries.
+    """
+
+    def __init__(
+        self, window: float = 0.0005, max_batch: int = 1024, cache_size: int = 100_000
+    ):
+        self.batchers = {
+            path: _Batcher(parameters, evaluate, window, max_batch)
+            for path, (parameters, evaluate) in ENDPOINTS.items()
+        }
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.stats = {"requests": 0, "cache hits": 0}
+
+    def info(self) -> dict:
+        """
+        Request, cache and batch statistics.
+        """
+        batches = sum(batcher.batches for batcher in self.batchers.values())
+        return {**self.stats, "batches": batches, "cache size": len(self.cache)}
+
+    async def query(self, path: str, args: dict) -> object:
+        """
+        The result of the endpoint `path` for the arguments `args`. Raises a
+        ValueError for invalid arguments and non-finite results, which are not
+        cached.
+        """
+        batcher = self.batchers[path]
+        if not isinstance(args, dict) or set(args) != set(batcher.parameters):
+            raise ValueError(f"{path} takes the arguments {batcher.parameters}.")
+        for name, value in args.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"{name} must be a number.")
+        self.stats["requests"] += 1
+        key = (path, *(cache.normalize(args[name]) for name in batcher.parameters))
+        if key in self.cache:
+            self.stats["cache hits"] += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        result = await batcher.submit(args)
+        try:
+            json.dumps(result, allow_nan=False)
+        except ValueError:
+            # NaN and inf are not valid JSON (and are not cached)
+            raise ValueError("The result is not finite for these arguments.")
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
+
+    async def _respond(self, method: str, path: str, body: bytes) -> tuple[str, dict]:
+        if method == "GET" and path == "/":
+            endpoints = {
+                path: batcher.parameters for path, batcher in self.batchers.items()
+            }
+            return "200 OK", {"endpoints": endpoints, "stats": self.info()}
+        if path not in self.batchers:
+            return "404 Not Found", {"error": f"Unknown endpoint {path!r}."}
+        if method != "POST":
+            return "405 Method Not Allowed", {"error": "Use POST."}
+        try:
+            result = await self.query(path, json.loads(body))
+        except ValueError as error:
+            # also raised for invalid JSON and by the formulas (e.g. loan.py)
+            return "400 Bad Request", {"error": str(error)}
+        except Exception as error:
+            # answer instead of dropping the connection
+            return "500 Internal Server Error", {
+                "error": f"{type(error).__name__}: {error}"
+            }
+        return "200 OK", {"result": result}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Serve the HTTP/1.1 requests of one connection (kept alive until closed).
+        """
+        try:
+            while request_line := await reader.readline():
+                method, path, version = request_line.decode("latin-1").split()
+                headers = dict()
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, payload = await self._respond(method, path, body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if version == "HTTP/1.0" or headers.get("connection") == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            # malformed request line or connection closed by the client
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8787) -> asyncio.Server:
+        """
+        Start listening. With port 0, a free port is chosen (see Server.sockets).
+        """
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def serve(host: str, port: int, **kwargs):
+    server = await Service(**kwargs).start(host, port)
+    print(f"Listening on http://{host}:{server.sockets[0].getsockname()[1]}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve the formulas as a local HTTP/JSON service."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument(
+        "--window",
+        type=float,
+        default=0.0005,
+        help="seconds to collect concurrent requests into one batch",
+    )
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, window=args.window))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,87 @@
+import json
+import os
+import re
+import numpy as np
+
+INDEX_FILE = "columns.json"
+
+
+def _file_name(name: str) -> str:
+    """
+    A file name for the column `name`, e.g., "net MPP (today)" -> "net_MPP_today.npy".
+    """
+    return re.sub(r"[^0-9A-Za-z]+", "_", name).strip("_") + ".npy"
+
+
+def save_columns(path: str, columns: dict[str, np.ndarray | list]):
+    """
+    Store the numeric columns of a result grid in the directory `path`, one .npy file
+    per column plus an index file with the column names in their original order.
+    Non-numeric columns (e.g., preformatted strings) are skipped.
+    """
+    os.makedirs(path, exist_ok=True)
+    index = dict()
+    for name, values in columns.items():
+        values = np.asarray(values)
+        if values.dtype.kind not in "biuf":
+            continue
+        index[name] = _file_name(name)
+        # replace existing files instead of overwriting them, since they may still
+        # be memory-mapped by load_columns
+        file = os.path.join(path, index[name])
+        with open(file + ".tmp", "wb") as f:
+            np.save(f, values)
+        os.replace(file + ".tmp", file)
+    with open(os.path.join(path, INDEX_FILE), "w", encoding="utf8") as f:
+        json.dump(index, f, indent=4, ensure_ascii=False)
+
+
+def create_columns(
+    path: str, dtypes: dict[str, np.dtype], n_rows: int
+) -> dict[str, np.memmap]:
+    """
+    Preallocate columns of `n_rows` rows in the directory `path`, in the layout of
+    save_columns, and return them memory-mapped for writing.
+    """
+    os.makedirs(path, exist_ok=True)
+    index = {name: _file_name(name) for name in dtypes}
+    columns = {
+        name: np.lib.format.open_memmap(
+            os.path.join(path, index[name]), mode="w+", dtype=dtype, shape=(n_rows,)
+        )
+        for name, dtype in dtypes.items()
+    }
+    with open(os.path.join(path, INDEX_FILE), "w", encoding="utf8") as f:
+        json.dump(index, f, indent=4, ensure_ascii=False)
+    return columns
+
+
+def load_columns(path: str, mmap_mode: str | None = "r") -> dict[str, np.ndarray]:
+    """
+    Load the columns stored by save_columns.
+
+    By default, the columns are memory-mapped read-only: nothing is read from disk
+    until the values are accessed.
+    """
+    with open(os.path.join(path, INDEX_FILE), encoding="utf8") as f:
+        index = json.load(f)
+    return {
+        name: np.load(os.path.join(path, file_name), mmap_mode=mmap_mode)
+        for name, file_name in index.items()
+    }
+
+
+def select(
+    columns: dict[str, np.ndarray], conditions: dict[str, float]
+) -> dict[str, np.ndarray]:
+    """
+    The rows where every column in `conditions` equals the given value, e.g.,
+    select(columns, {"rate": 0.07, "growth years": 30}).
+
+    Only the condition columns are scanned and only the matching rows are copied.
+    """
+    mask = np.ones(len(next(iter(columns.values()))), dtype=bool)
+    for name, value in conditions.items():
+        mask &= np.isclose(columns[name], value, rtol=0, atol=1e-12)
+    rows = np.flatnonzero(mask)
+    return {name: values[rows] for name, values in columns.items()}
@@ -0,0 +1,160 @@
+from typing import Callable
+import argparse
+import json
+import os
+import numpy as np
+import grid
+import instrument
+import manifest
+import store
+import tax as tx
+import utils as ut
+
+PROGRESS_FILE = "progress.json"
+
+
+def _load_progress(path: str) -> dict | None:
+    try:
+        with open(os.path.join(path, PROGRESS_FILE), encoding="utf8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _save_progress(path: str, progress: dict):
+    file = os.path.join(path, PROGRESS_FILE)
+    with open(file + ".tmp", "w", encoding="utf8") as f:
+        json.dump(progress, f, indent=4)
+    os.replace(file + ".tmp", file)
+
+
+def sweep(
+    path: str,
+    axes: dict[str, list],
+    compute_rows: Callable[[dict[str, np.ndarray]], dict[str, np.ndarray]],
+    params: dict | None = None,
+    chunk_size: int = 100_000,
+    depends: tuple = (),
+) -> dict[str, np.ndarray]:
+    """
+    Compute the grid of all combinations of `axes` chunk by chunk and write it to
+    the directory `path` in the layout of store.save_columns.
+
+    `compute_rows` gets the axis columns of `chunk_size` rows and returns all
+    columns of these rows (like grid.etf_rows). The columns are preallocated as
+    .npy files and every chunk is written into a memory map of its rows, so the
+    memory needed depends on `chunk_size` and not on the size of the grid.
+
+    The number of completed chunks is kept in progress.json. If a sweep with the
+    same axes, `params` (the other inputs of `compute_rows`), chunk size and code
+    version of `compute_rows` and the modules or functions in `depends` that it
+    calls (see manifest.code_version) was interrupted, it resumes after the last
+    completed chunk. Otherwise, it starts over.
+
+    Returns the columns, memory-mapped read-only (see store.load_columns).
+    """
+    n_rows = int(np.prod([len(values) for values in axes.values()]))
+    n_chunks = -(-n_rows // chunk_size)
+    setup = {
+        "axes": axes,
+        "params": params,
+        "chunk_size": chunk_size,
+        "code": manifest.code_version(compute_rows, *depends),
+    }
+    # round trip through JSON, so that it compares equal to a loaded setup
+    setup = json.loads(json.dumps(setup))
+    progress = _load_progress(path)
+
+    if progress is not None and progress["setup"] == setup:
+        done = progress["done"]
+        columns = store.load_columns(path, mmap_mode="r+")
+        chunk = None
+    else:
+        # the first chunk determines the columns and their types
+        with instrument.stage("sweep: compute"):
+            chunk = compute_rows(grid.cartesian_rows(axes, 0, min(chunk_size, n_rows)))
+        columns = store.create_columns(
+            path,
+            {name: np.asarray(values).dtype for name, values in chunk.items()},
+            n_rows,
+        )
+        done = 0
+        progress = {"setup": setup, "done": done, "chunks": n_chunks}
+        _save_progress(path, progress)
+
+    for i in range(done, n_chunks):
+        start = i * chunk_size
+        stop = min(start + chunk_size, n_rows)
+        if chunk is None:
+            with instrument.stage("sweep: compute"):
+                chunk = compute_rows(grid.cartesian_rows(axes, start, stop))
+        with instrument.stage("sweep: write"):
+            for name, values in chunk.items():
+                # map only the rows of this chunk, so that the written pages of
+                # previous chunks do not stay resident
+                column = columns[name]
+                rows = np.memmap(
+                    column.filename,
+                    dtype=column.dtype,
+                    mode="r+",
+                    offset=column.offset + start * column.dtype.itemsize,
+                    shape=(stop - start,),
+                )
+                rows[:] = values
+                rows.flush()
+        chunk = None
+        progress["done"] = i + 1
+        _save_progress(path, progress)
+        instrument.count("sweep: chunks")
+    del columns
+    return store.load_columns(path)
+
+
+def etf_sweep(
+    path: str,
+    contributions: list[float],
+    start_balances: list[float],
+    rates: list[float],
+    growth_years: list[int],
+    consume_years: list[int],
+    inflations: list[float],
+    contributions_per_year: int = 12,
+    chunk_size: int = 100_000,
+) -> dict[str, np.ndarray]:
+    """
+    The table of etf.py (see grid.etf_grid) with the inflation as an additional axis,
+    computed out of core with sweep.
+    """
+    axes = grid.etf_axes(
+        contributions, start_balances, rates, growth_years, consume_years
+    )
+    axes["inflation"] = inflations
+    return sweep(
+        path,
+        axes,
+        lambda rows: grid.etf_rows(rows, rows["inflation"], contributions_per_year),
+        params={"contributions_per_year": contributions_per_year},
+        chunk_size=chunk_size,
+        depends=(grid, tx, ut),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compute a wide etf.py grid into memory-mapped columns."
+    )
+    parser.add_argument("path", help="output directory (resumed if interrupted)")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    args = parser.parse_args()
+
+    columns = etf_sweep(
+        args.path,
+        contributions=list(range(0, 3_001, 250)),
+        start_balances=list(range(0, 2_000_001, 10_000)),
+        rates=[round(0.02 + 0.0025 * i, 4) for i in range(33)],
+        growth_years=[10, 20, 30, 40],
+        consume_years=[20, 30, 40],
+        inflations=[0.01, 0.02, 0.03, 0.04],
+        chunk_size=args.chunk_size,
+    )
+    print(f"{len(columns['rate'])} rows in {args.path}")
@@ -0,0 +1,167 @@
+from typing import Callable, TextIO
+import re
+import numpy as np
+import instrument
+
+# format strings whose output length is largest at the minimum or maximum value
+_FIXED_WIDTH = re.compile(r"[^{}]*\{:[+\- ]?,?\d*(\.\d+)?[df]\}[^{}]*")
+
+
+def _column_width(header: str, values: np.ndarray, fmt: str, chunk_size: int) -> int:
+    """
+    The width of a column: at least the header plus two spaces (as in tabulate).
+
+    For fixed-point formats of numeric columns, the width follows from the range of
+    the values. Otherwise, the formatted values are measured chunk by chunk.
+    """
+    width = len(header) + 2
+    if values.size == 0:
+        return width
+    fixed_width = (
+        _FIXED_WIDTH.fullmatch(fmt) or fmt == "{}" and values.dtype.kind in "iu"
+    )
+    if values.dtype.kind in "iuf" and fixed_width:
+        finite = np.isfinite(values)
+        candidates = (
+            [values[finite].min(), values[finite].max()] if finite.any() else []
+        )
+        nonfinite = values[~finite]
+        candidates += [np.nan] if np.isnan(nonfinite).any() else []
+        candidates += [v for v in (np.inf, -np.inf) if (nonfinite == v).any()]
+        return max(width, *[len(fmt.format(v)) for v in candidates])
+    for start in range(0, values.size, chunk_size):
+        chunk = values[start : start + chunk_size].tolist()
+        width = max(width, *[len(fmt.format(v)) for v in chunk])
+    return width
+
+
+def _decimals(cell: str) -> int | None:
+    """
+    The number of characters after the decimal point (or the exponent) of a number,
+    -1 for integers and None for strings that are no numbers (as in tabulate).
+    """
+    try:
+        float(cell)
+    except ValueError:
+        return None
+    try:
+        int(cell)
+        return -1
+    except ValueError:
+        pass
+    point = cell.rfind(".")
+    if point < 0:
+        point = cell.lower().rfind("e")
+    return len(cell) - point - 1 if point >= 0 else -1
+
+
+def _decimal_layout(
+    values: np.ndarray, fmt: str, chunk_size: int
+) -> tuple[int, int] | None:
+    """
+    The longest part before the decimal point and the most decimals of a column, or
+    None if some formatted value is no number.
+    """
+    lead, decimals = 0, -1
+    for start in range(0, values.size, chunk_size):
+        for x in values[start : start + chunk_size].tolist():
+            cell = fmt.format(x)
+            d = _decimals(cell)
+            if d is None:
+                return None
+            lead, decimals = max(lead, len(cell) - d), max(decimals, d)
+    return lead, decimals
+
+
+def write_table(
+    f: TextIO,
+    columns: dict[str, np.ndarray | list],
+    formats: dict[str, str] | None = None,
+    tablefmt: str = "grid",
+    align: str = "left",
+    chunk_size: int = 10_000,
+):
+    """
+    Write `columns` to `f` as a table in the "grid" or "psql" format of tabulate.
+
+    The column widths are determined before any row is written. The rows are then
+    formatted and written in chunks of `chunk_size`, so memory does not grow with the
+    number of rows.
+
+    `formats` maps column names to format strings such as "{:.0f} k". Columns
+    without a format are written with "{}". `align` is "left", "right" or
+    "decimal". With "decimal", columns whose formatted values are all numbers are
+    aligned at the decimal point and right-aligned, and all other columns are
+    left-aligned (as numalign="decimal" of tabulate, e.g. with formats "{:g}").
+    """
+    if tablefmt not in ("grid", "psql"):
+        raise ValueError(f"Unknown table format {tablefmt!r}. Use 'grid' or 'psql'.")
+    if align not in ("left", "right", "decimal"):
+        raise ValueError(
+            f"Unknown alignment {align!r}. Use 'left', 'right' or 'decimal'."
+        )
+    formats = formats or dict()
+
+    headers = list(columns)
+    values = [np.asarray(columns[h]) for h in headers]
+    fmts = [formats.get(h, "{}") for h in headers]
+    n_rows = len(values[0]) if values else 0
+    widths = [
+        _column_width(h, v, fmt, chunk_size) for h, v, fmt in zip(headers, values, fmts)
+    ]
+    layouts = [
+        _decimal_layout(v, fmt, chunk_size) if align == "decimal" else None
+        for v, fmt in zip(values, fmts)
+    ]
+    widths = [
+        w if layout is None else max(len(h) + 2, sum(layout))
+        for h, w, layout in zip(headers, widths, layouts)
+    ]
+    pads: list[Callable[[str, int], str]] = [
+        (
+            str.ljust
+            if align == "left" or align == "decimal" and layout is None
+            else str.rjust
+        )
+        for layout in layouts
+    ]
+
+    def line(fill: str, edge: str = "+") -> str:
+        return edge + "+".join(fill * (w + 2) for w in widths) + edge
+
+    def row(cells: list[str]) -> str:
+        return (
+            "| "
+            + " | ".join(pad(c, w) for pad, c, w in zip(pads, cells, widths))
+            + " |"
+        )
+
+    def decimal_aligned(cells: list[str], layout: tuple[int, int] | None) -> list:
+        # pad the decimals so that the decimal points align
+        if layout is None:
+            return cells
+        return [c + " " * (layout[1] - _decimals(c)) for c in cells]
+
+    f.write(line("-") + "\n" + row(headers) + "\n")
+    if tablefmt == "grid":
+        f.write(line("="))
+        row_end = "\n" + line("-")
+    else:
+        f.write(line("-", edge="|"))
+        row_end = ""
+
+    for start in range(0, n_rows, chunk_size):
+        with instrument.stage("table: format"):
+            cells = [
+                decimal_aligned(
+                    [fmt.format(x) for x in v[start : start + chunk_size].tolist()],
+                    layout,
+                )
+                for v, fmt, layout in zip(values, fmts, layouts)
+            ]
+            text = "".join("\n" + row(r) + row_end for r in zip(*cells))
+        with instrument.stage("table: write"):
+            f.write(text)
+
+    if tablefmt == "psql" or n_rows == 0:
+        f.write("\n" + line("-"))
@@ -0,0 +1,177 @@
+import argparse
+import sys
+import numpy as np
+import grid
+import instrument
+import table
+import utils as ut
+
+
+def _net_mpp_today(
+    start_balance, rate, contribution, growth_years, consume_years, inflation, P, tax
+):
+    """
+    The net MPP (today) of the rows of etf.py with the given contributions.
+    """
+    rows = grid.etf_rows(
+        {
+            "contribution": contribution,
+            "start balance": start_balance,
+            "rate": rate,
+            "growth years": growth_years,
+            "consume years": consume_years,
+        },
+        inflation,
+        P,
+        tax,
+    )
+    return rows["net MPP (today)"]
+
+
+def required_contribution(
+    target: float | np.ndarray,
+    start_balance: float | np.ndarray,
+    annual_interest_rate: float | np.ndarray,
+    growth_years: int | np.ndarray,
+    consume_years: int | np.ndarray,
+    annual_rate_of_inflation: float | np.ndarray,
+    contributions_per_year: int = 12,
+    tax: str = "flat",
+    tol: float = 0.01,
+) -> float | np.ndarray:
+    """
+    The minimum regular contribution during the growth years for a net MPP (today)
+    of at least `target`, as in etf.py (see grid.etf_rows).
+
+    With the flat tax, the net MPP is linear in the end balance and thus in the
+    contribution, so the contribution follows in closed form from
+    utils.required_start_balance and utils.compound_interest_contribution. With the
+    German tax (see tax.py), all problems are solved together by bisection to an
+    absolute tolerance of `tol`. The flat-tax contribution is an upper bound for
+    it, since the German tax never exceeds the flat tax on a withdrawal; it is
+    doubled where it does not reach the target.
+
+    The result is 0 if the start balance alone reaches the target and inf if no
+    contribution does (without growth years).
+
+    All arguments except the last three can be arrays. They are broadcast against
+    each other.
+    """
+    if tax not in ("flat", "german"):
+        raise ValueError(f"Unknown tax {tax!r}, use 'flat' or 'german'.")
+    target, K_0, r, gy, cy, q = np.broadcast_arrays(
+        np.asarray(target, dtype=float),
+        np.asarray(start_balance, dtype=float),
+        np.asarray(annual_interest_rate, dtype=float),
+        np.asarray(growth_years),
+        np.asarray(consume_years),
+        np.asarray(annual_rate_of_inflation, dtype=float),
+    )
+
+    # the end balance whose MPP after the flat tax is worth `target` today
+    mpp = target / ut.value_today(1.0, gy, q) / ut.subtract_gains_tax(1.0)
+    end_balance = ut.required_start_balance(mpp, cy, r, q)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        m = ut.compound_interest_contribution(
+            K_0, end_balance, r, contributions_per_year, gy
+        )
+    m = np.where(end_balance <= K_0, 0.0, np.maximum(m, 0.0))
+    if tax == "flat":
+        return m[()]
+
+    P = contributions_per_year
+    # the problems are solved as flat arrays, so that scalars can be indexed
+    shape = m.shape
+    target, K_0, r, gy, cy, q, m = (a.ravel() for a in (target, K_0, r, gy, cy, q, m))
+
+    def f(rows, m):
+        # the net MPP (today) of the problems `rows` minus the target
+        net = _net_mpp_today(K_0[rows], r[rows], m, gy[rows], cy[rows], q[rows], P, tax)
+        return net - target[rows]
+
+    lo = np.zeros(m.shape)
+    hi = m.copy()
+    # problems reaching the target without contributions or with none at all
+    active = np.isfinite(hi) & (hi > 0)
+    active[active] = f(active, lo[active]) < 0
+    hi[np.isfinite(m) & ~active] = 0.0
+    # the flat-tax contribution should reach the target; if not, double it
+    short = active.copy()
+    for _ in range(60):
+        short[short] = f(short, hi[short]) < 0
+        if not short.any():
+            break
+        lo[short] = hi[short]
+        hi[short] *= 2
+        instrument.count("required_contribution: bracket doublings")
+    instrument.count("required_contribution: problems", np.count_nonzero(active))
+    while active.any():
+        mid = (lo[active] + hi[active]) / 2
+        reached = f(active, mid) >= 0
+        hi[active] = np.where(reached, mid, hi[active])
+        lo[active] = np.where(reached, lo[active], mid)
+        instrument.count("required_contribution: bisection steps")
+        active &= hi - lo > tol
+    return hi.reshape(shape)[()]
+
+
+def contribution_grid(
+    target: float,
+    start_balances: list[float],
+    rates: list[float],
+    growth_years: list[int],
+    consume_years: list[int],
+    inflations: list[float],
+    contributions_per_year: int = 12,
+    tax: str = "flat",
+) -> dict[str, np.ndarray]:
+    """
+    The required contribution (see required_contribution) for all combinations of
+    the given axes, as columns with one entry per combination.
+    """
+    columns = grid.cartesian(
+        {
+            "start balance": start_balances,
+            "rate": rates,
+            "growth years": growth_years,
+            "consume years": consume_years,
+            "inflation": inflations,
+        }
+    )
+    columns["contribution"] = required_contribution(
+        target,
+        columns["start balance"],
+        columns["rate"],
+        columns["growth years"],
+        columns["consume years"],
+        columns["inflation"],
+        contributions_per_year=contributions_per_year,
+        tax=tax,
+    )
+    return columns
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Print the monthly contribution needed for a net MPP (today)."
+    )
+    parser.add_argument("target", type=float, help="net MPP (today) in €")
+    parser.add_argument("--tax", choices=["flat", "german"], default="flat")
+    args = parser.parse_args()
+
+    columns = contribution_grid(
+        args.target,
+        start_balances=[0, 50_000, 100_000, 200_000, 500_000, 1000_000],
+        rates=[0.05, 0.06, 0.07],
+        growth_years=[10, 20, 30],
+        consume_years=[20, 30, 40],
+        inflations=[0.02, 0.03],
+        tax=args.tax,
+    )
+    columns["start balance"] = columns["start balance"] / 1e3
+    table.write_table(
+        sys.stdout,
+        columns,
+        formats={"start balance": "{:.0f} k", "contribution": "{:.0f}"},
+        tablefmt="psql",
+    )
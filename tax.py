@@ -0,0 +1,160 @@
+import numpy as np
+import utils as ut
+
+# Abgeltungsteuer (25%) plus Solidaritätszuschlag (5.5% of it), without church tax
+TAX_RATE = 0.25 * 1.055
+# Sparerpauschbetrag per person and year (since 2023)
+ALLOWANCE = 1_000
+# Teilfreistellung of equity funds (at least 51% equities)
+PARTIAL_EXEMPTION = 0.3
+# Basiszins of the Vorabpauschale (2024)
+BASE_RATE = 0.0229
+
+
+def german_tax(
+    initial_balance: float | np.ndarray,
+    annual_interest_rate: float | np.ndarray,
+    regular_contribution: float | np.ndarray,
+    growth_years: int | np.ndarray,
+    consume_years: int | np.ndarray,
+    annual_rate_of_inflation: float | np.ndarray,
+    contributions_per_year: int = 12,
+    monthly_withdrawal: float | np.ndarray | None = None,
+    allowance: float = ALLOWANCE,
+    partial_exemption: float = PARTIAL_EXEMPTION,
+    base_rate: float = BASE_RATE,
+) -> dict[str, np.ndarray]:
+    """
+    German capital gains tax of an accumulating equity ETF, year by year.
+
+    The balance follows compound_interest during the growth years and is consumed by
+    inflation-indexed withdrawals at the beginning of each month during the consume
+    years (by default the monthly purchasing power of the end balance). The cost
+    basis starts with the initial balance and grows with every contribution.
+
+    Every year, the taxable income is
+      - the Vorabpauschale: the value at the start of the year of the units still
+        held at its end (plus the contributions of the year, reduced by 1/12 per
+        month before their purchase) times 0.7 * `base_rate`, but at most the gain
+        of the year,
+      - plus the gains share of the withdrawals: a withdrawal w sells the fraction
+        w / value of the holdings and realizes w times (1 - cost basis / value),
+    of which `partial_exemption` (Teilfreistellung) is tax-free. Losses are carried
+    forward, the first `allowance` (Sparerpauschbetrag) of the remaining income is
+    tax-free and the rest is taxed with TAX_RATE. Taxed Vorabpauschalen are added to
+    the cost basis, so they are not taxed again when selling. The cost basis is
+    averaged over all units (instead of first in, first out).
+
+    The tax is paid from the withdrawals of the same year (or from outside during
+    the growth years), so the balance itself is not affected.
+
+    All arguments except the last four can be arrays of scenarios. They are
+    broadcast against each other and all scenarios are processed together, month by
+    month.
+
+    Returns per scenario
+        "end balance": the balance after the growth years,
+        "tax during growth": the tax on the Vorabpauschalen of the growth years,
+        "gross withdrawals": the sum of all withdrawals,
+        "tax during consumption": the tax of the consume years,
+        "net withdrawals": the gross withdrawals minus the tax during consumption,
+        "net MPP": the monthly withdrawal scaled by the net share of all withdrawals.
+    """
+    if 12 % contributions_per_year != 0:
+        raise ValueError("The contributions per year must divide 12.")
+    K_0, r, m, gy, cy, q = np.broadcast_arrays(
+        np.asarray(initial_balance, dtype=float),
+        np.asarray(annual_interest_rate, dtype=float),
+        np.asarray(regular_contribution, dtype=float),
+        np.asarray(growth_years),
+        np.asarray(consume_years),
+        np.asarray(annual_rate_of_inflation, dtype=float),
+    )
+    T = 12 * gy
+    K = 12 * cy
+    end_balance = ut.compound_interest(K_0, r, m, contributions_per_year, gy)
+    if monthly_withdrawal is None:
+        # no withdrawals without consume years
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mpp = ut.monthly_purchasing_power(end_balance, cy, r, q)
+        monthly_withdrawal = np.where(cy > 0, mpp, 0.0)
+    w = np.broadcast_to(monthly_withdrawal, K_0.shape).astype(float)
+
+    monthly_rate = ut.annual_to_monthly(r)
+    monthly_inflation = ut.annual_to_monthly(q)
+    months_between_contributions = 12 // contributions_per_year
+
+    value = K_0.copy()
+    basis = K_0.copy()
+    loss_carry = np.zeros(K_0.shape)
+    tax_growth = np.zeros(K_0.shape)
+    tax_consumption = np.zeros(K_0.shape)
+    gross_withdrawals = np.zeros(K_0.shape)
+    # per year: value at the start, contributions minus withdrawals, contributions
+    # weighted for the Vorabpauschale and the gains realized by withdrawals
+    year_start = value.copy()
+    flows = np.zeros(K_0.shape)
+    weighted = np.zeros(K_0.shape)
+    realized = np.zeros(K_0.shape)
+    kept = np.ones(K_0.shape)
+
+    for t in range(1, int(np.max(T + K, initial=0)) + 1):
+        month = (t - 1) % 12 + 1
+        growing = t <= T
+        consuming = (t > T) & (t <= T + K)
+
+        # growth years: grow and then contribute (as in compound_interest)
+        if month % months_between_contributions == 0:
+            contribution = np.where(growing, m, 0.0)
+        else:
+            contribution = 0.0
+        # consume years: withdraw and then grow (as in monthly_purchasing_power)
+        withdrawal = np.where(consuming, w * monthly_inflation ** (t - T - 1), 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sold = np.where(value > 0, np.minimum(withdrawal / value, 1.0), 0.0)
+        realized += sold * (value - basis)
+        kept *= 1 - sold
+        basis -= sold * basis
+        value = np.where(growing, value * monthly_rate + contribution, value)
+        value = np.where(consuming, (value - withdrawal) * monthly_rate, value)
+        basis += contribution
+        flows += contribution - withdrawal
+        # the contribution is bought at the end of the month: month - 1 full months
+        # precede it
+        weighted += contribution * (13 - month) / 12
+        gross_withdrawals += withdrawal
+
+        if month == 12:
+            active = growing | consuming
+            gain = value - year_start - flows
+            vorabpauschale = np.clip(
+                (year_start * kept + weighted) * 0.7 * base_rate,
+                0.0,
+                np.maximum(gain, 0.0),
+            )
+            income = (vorabpauschale + realized) * (1 - partial_exemption) - loss_carry
+            loss_carry = np.where(active, np.maximum(-income, 0.0), loss_carry)
+            tax = np.where(active, np.maximum(income - allowance, 0.0) * TAX_RATE, 0.0)
+            tax_growth += np.where(growing, tax, 0.0)
+            tax_consumption += np.where(consuming, tax, 0.0)
+            basis += np.where(active, vorabpauschale, 0.0)
+
+            year_start = value.copy()
+            flows = np.zeros(K_0.shape)
+            weighted = np.zeros(K_0.shape)
+            realized = np.zeros(K_0.shape)
+            kept = np.ones(K_0.shape)
+
+    net_withdrawals = gross_withdrawals - tax_consumption
+    with np.errstate(divide="ignore", invalid="ignore"):
+        net_share = np.where(
+            gross_withdrawals > 0, net_withdrawals / gross_withdrawals, 1.0
+        )
+    return {
+        "end balance": np.asarray(end_balance)[()],
+        "tax during growth": tax_growth[()],
+        "gross withdrawals": gross_withdrawals[()],
+        "tax during consumption": tax_consumption[()],
+        "net withdrawals": net_withdrawals[()],
+        "net MPP": (w * net_share)[()],
+    }
@@ -0,0 +1,99 @@
+import backtest as bt
+import numpy as np
+import pytest
+import utils as ut
+
+TOL = 1e-6  # relative tolerance
+
+
+def naive(returns, K_0, m, T, K, w, inflation):
+    """
+    Month-by-month balances of a single window.
+    """
+    balance = K_0
+    for t in range(T):
+        balance = balance * (1 + returns[t]) + m
+    end_balance = balance
+    q = ut.annual_to_monthly(inflation)
+    depleted = False
+    for j in range(K):
+        balance -= w * q**j
+        depleted |= balance < -1e-2
+        balance *= 1 + returns[T + j]
+    return end_balance, balance, depleted
+
+
+def test_backtest_constant():
+    """
+    With a constant return, every window must follow compound_interest and be
+    consumed exactly by the monthly purchasing power.
+    """
+    for rate in [0, 0.03, 0.07]:
+        for gy, cy in [(0, 10), (10, 20), (30, 40)]:
+            returns = np.full(12 * (gy + cy) + 24, ut.annual_to_monthly(rate) - 1)
+            result = bt.backtest(returns, 100_000, 1_000, gy, cy, rate, 0.03)
+            eb = ut.compound_interest(100_000, rate, 1_000, 12, gy)
+
+            assert len(result["end balance"]) == 25
+            assert np.all(np.abs(result["end balance"] / eb - 1) < TOL)
+            assert np.all(np.abs(result["final balance"]) < TOL * eb)
+            assert not result["depleted"].any()
+
+
+def test_backtest_windows():
+    """
+    Compare every rolling window of a random series to a month-by-month computation.
+    """
+    rng = np.random.default_rng(0)
+    returns = rng.normal(0.006, 0.04, 12 * 50)
+    for w in [None, 400, 1_500]:
+        result = bt.backtest(returns, 50_000, 500, 10, 20, 0.05, 0.02, w)
+        for s in result["start month"]:
+            withdrawal = w
+            if w is None:
+                withdrawal = ut.monthly_purchasing_power(
+                    result["end balance"][s], 20, 0.05, 0.02
+                )
+            eb, fb, depleted = naive(
+                returns[s:], 50_000, 500, 120, 240, withdrawal, 0.02
+            )
+
+            assert abs(result["end balance"][s] / eb - 1) < TOL
+            assert abs(result["final balance"][s] - fb) < TOL * eb
+            assert result["depleted"][s] == depleted
+
+
+def test_backtest_scenarios():
+    """
+    Arrays of scenarios get the windows as their last axis.
+    """
+    returns = np.random.default_rng(1).normal(0.005, 0.03, 12 * 40)
+    contributions = np.array([0, 500, 1_000])
+    result = bt.backtest(returns, 10_000, contributions, 10, 20, 0.05, 0.02, 800)
+
+    assert result["final balance"].shape == (3, 12 * 10 + 1)
+    for i, m in enumerate(contributions):
+        single = bt.backtest(returns, 10_000, m, 10, 20, 0.05, 0.02, 800)
+        assert np.allclose(result["final balance"][i], single["final balance"])
+
+    with pytest.raises(ValueError):
+        bt.backtest(returns, 10_000, 500, 20, 30, 0.05, 0.02)
+
+
+def test_load_returns(tmp_path):
+    """
+    Load the returns from a CSV file and from a memory-mapped .npy file.
+    """
+    returns = np.array([0.01, -0.02, 0.005])
+    path = str(tmp_path / "returns.csv")
+    with open(path, "w", encoding="utf8") as f:
+        f.write("month,return\n")
+        for i, r in enumerate(returns):
+            f.write(f"2000-{i + 1:02d},{r}\n")
+    assert np.array_equal(bt.load_returns(path), returns)
+    with pytest.raises(ValueError):
+        bt.load_returns(path, column="close")
+
+    np.save(tmp_path / "returns.npy", returns)
+    loaded = bt.load_returns(str(tmp_path / "returns.npy"))
+    assert isinstance(loaded, np.memmap) and np.array_equal(loaded, returns)
@@ -0,0 +1,102 @@
+import cache
+import numpy as np
+import utils as ut
+
+
+def test_memoize():
+    """
+    Equal arguments (after normalization) must be computed only once.
+    """
+    calls = list()
+
+    @cache.memoize(maxsize=2)
+    def f(x, y=1.0):
+        calls.append((x, y))
+        return x + y
+
+    assert f(0.1 + 0.2) == f(0.3) == f(x=0.3, y=1)
+    assert len(calls) == 1
+    assert f.cache_info()["hits"] == 2
+
+    # least recently used entries are evicted
+    f(1)
+    f(2)
+    f(0.3)
+    assert len(calls) == 4
+    assert f.cache_info()["currsize"] == 2
+
+    # arrays are keyed by their values
+    assert np.array_equal(f(np.arange(3)), f(np.arange(3.0)))
+    assert len(calls) == 5
+
+    # numbers are rounded to significant digits, so small values do not collide
+    assert f(1e-13) != f(3e-13)
+    assert not np.array_equal(f(np.array([1e-13])), f(np.array([3e-13])))
+    assert cache.normalize(1e-13) != cache.normalize(3e-13)
+    assert cache.normalize(123456.0) == cache.normalize(123456.0 + 1e-8)
+
+
+def test_memoize_disk(tmp_path):
+    """
+    Results stored on disk are found by a new in-process cache.
+    """
+    calls = list()
+
+    def g(x):
+        calls.append(x)
+        return {"x": np.full(3, x)}
+
+    cache.set_directory(tmp_path)
+    try:
+        assert cache.memoize(g)(2)["x"].tolist() == [2, 2, 2]
+        g_new = cache.memoize(g)
+        assert g_new(2)["x"].tolist() == [2, 2, 2]
+    finally:
+        cache.set_directory(None)
+
+    assert len(calls) == 1
+    assert g_new.cache_info()["disk_hits"] == 1
+
+
+def test_memoize_disk_code_version(tmp_path):
+    """
+    A changed function must not reuse the results of the old one on disk, and
+    ignored arguments must not be part of the key.
+    """
+
+    def old():
+        def h(x, workers=None):
+            return x + 1
+
+        return h
+
+    def new():
+        def h(x, workers=None):
+            return x + 2
+
+        return h
+
+    cache.set_directory(tmp_path)
+    try:
+        assert cache.memoize(old())(1) == 2
+        h_new = cache.memoize(new(), ignore=("workers",))
+        assert h_new(1) == 3
+        assert h_new.cache_info()["misses"] == 1
+        assert h_new(1, workers=4) == 3
+        assert h_new.cache_info()["hits"] == 1
+
+        h_again = cache.memoize(new(), ignore=("workers",))
+        assert h_again(1) == 3
+        assert h_again.cache_info()["disk_hits"] == 1
+    finally:
+        cache.set_directory(None)
+
+
+def test_cached_functions():
+    """
+    The cached versions must return the results of the wrapped functions.
+    """
+    args = (100_000, 250_000, 500, 12, 10)
+    assert cache.compound_interest_rate(*args) == ut.compound_interest_rate(*args)
+    args = (500_000, 30, 0.05, 0.02)
+    assert cache.monthly_purchasing_power(*args) == ut.monthly_purchasing_power(*args)
@@ -0,0 +1,109 @@
+import functools
+import grid
+import instrument
+import numpy as np
+import utils as ut
+
+TOL = 1e-6  # tolerance
+
+CONSUME_YEARS = [20, 30]
+CONTRIBUTIONS = [0, 500, 3000]
+GROWTH_YEARS = [10, 30]
+INFLATION = 0.03
+RATES = [0, 0.03, 0.07]
+START_BALANCES = [0, 150_000]
+
+
+def test_cartesian():
+    """
+    The rows must be in the order of nested for loops over the axes.
+    """
+    t_dict = grid.cartesian({"a": [1, 2], "b": [0.5, 1.5, 2.5]})
+
+    assert t_dict["a"].tolist() == [1, 1, 1, 2, 2, 2]
+    assert t_dict["b"].tolist() == [0.5, 1.5, 2.5] * 2
+
+
+def test_etf_grid():
+    """
+    Compare every row of the grid to a scalar computation in nested loops.
+    """
+    t_dict = grid.etf_grid(
+        contributions=CONTRIBUTIONS,
+        start_balances=START_BALANCES,
+        rates=RATES,
+        growth_years=GROWTH_YEARS,
+        consume_years=CONSUME_YEARS,
+        inflation=INFLATION,
+    )
+
+    row = 0
+    for c in CONTRIBUTIONS:
+        for sb in START_BALANCES:
+            for r in RATES:
+                for gy in GROWTH_YEARS:
+                    for cy in CONSUME_YEARS:
+                        eb = ut.compound_interest(sb, r, c, 12, gy)
+                        mpp = ut.monthly_purchasing_power(eb, cy, r, INFLATION)
+                        net_mpp = ut.subtract_gains_tax(mpp)
+                        net_mpp_today = ut.value_today(net_mpp, gy, INFLATION)
+
+                        assert t_dict["contribution"][row] == c
+                        assert t_dict["start balance"][row] == sb
+                        assert t_dict["rate"][row] == r
+                        assert t_dict["growth years"][row] == gy
+                        assert t_dict["consume years"][row] == cy
+                        assert abs(t_dict["end balance"][row] - eb) < TOL
+                        assert abs(t_dict["net MPP (today)"][row] - net_mpp_today) < TOL
+                        row += 1
+
+    assert row == len(t_dict["contribution"])
+
+
+def test_merge():
+    """
+    Merging a previous grid with changed axes must equal computing the new grid, and
+    only rows with new axis values may be computed.
+    """
+    old_axes = grid.etf_axes(CONTRIBUTIONS, START_BALANCES, RATES, [10], CONSUME_YEARS)
+    old_columns = grid.etf_grid(*old_axes.values(), inflation=INFLATION)
+    # one new rate and growth year, one removed contribution, reordered consume years
+    axes = grid.etf_axes([0, 3000], START_BALANCES, RATES + [0.05], [10, 30], [30, 20])
+
+    def compute_rows(rows):
+        computed.append(len(rows["rate"]))
+        return grid.etf_rows(rows, INFLATION)
+
+    computed = list()
+    t_dict, n_computed = grid.merge(axes, old_axes, old_columns, compute_rows)
+    expected = grid.etf_grid(*axes.values(), inflation=INFLATION)
+
+    # rows with rate 0.05 or growth years 30
+    assert n_computed == computed[0] == 2 * 2 * (4 * 2 - 3 * 1) * 2
+    for name, values in expected.items():
+        assert values.dtype == t_dict[name].dtype
+        assert all(abs(values - t_dict[name]) < TOL)
+
+
+def test_parallel_grid():
+    """
+    The grid must not depend on the number of workers and chunks, and the counters
+    of the workers must be merged.
+    """
+    axes = grid.etf_axes([0, 500, 1000], [0, 100_000], [0.05, 0.07], [10, 20], [30])
+    compute_rows = functools.partial(grid.etf_rows, inflation=0.02)
+    expected = grid.etf_rows(grid.cartesian(axes), 0.02)
+
+    instrument.enable()
+    instrument.reset()
+    try:
+        for workers, chunk_size in [(1, 100), (1, 5), (2, 5), (3, 7)]:
+            columns = grid.parallel_grid(axes, compute_rows, workers, chunk_size)
+            for name, values in expected.items():
+                assert np.array_equal(columns[name], values)
+        timers = instrument.snapshot()["timers"]
+    finally:
+        instrument.disable()
+        instrument.reset()
+    # 5 chunks of 5 rows and 4 chunks of 7 rows in the worker processes
+    assert timers["grid: compute"]["calls"] == 9
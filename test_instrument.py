@@ -0,0 +1,75 @@
+import instrument
+import json
+import utils as ut
+
+
+def test_disabled():
+    """
+    Nothing is collected while the instrumentation is disabled.
+    """
+    instrument.disable()
+    instrument.reset()
+    instrument.count("a")
+    instrument.histogram("b", [1.0])
+    with instrument.stage("c"):
+        pass
+
+    assert instrument.snapshot() == {"counters": {}, "histograms": {}, "timers": {}}
+
+
+def test_collect(tmp_path):
+    """
+    Counters, histograms and timers are collected, merged and dumped as JSON.
+    """
+    instrument.enable()
+    instrument.reset()
+    try:
+        instrument.count("a")
+        instrument.count("a", 2)
+        instrument.histogram("b", [0, 1e-13, 5e-3, -5e-3, 1e6, float("nan")])
+        for _ in range(3):
+            with instrument.stage("c"):
+                pass
+        stats = instrument.snapshot()
+
+        assert stats["counters"] == {"a": 3}
+        counts = stats["histograms"]["b"]["counts"]
+        assert sum(counts) == 6
+        assert counts[0] == 2 and counts[10] == 2 and counts[-1] == 2
+        assert stats["timers"]["c"]["calls"] == 3
+
+        instrument.merge(stats)
+        assert instrument.snapshot()["counters"] == {"a": 6}
+        assert instrument.snapshot()["timers"]["c"]["calls"] == 6
+
+        path = tmp_path / "stats.json"
+        instrument.dump(str(path))
+        with open(path, encoding="utf8") as f:
+            assert json.load(f) == instrument.snapshot()
+    finally:
+        instrument.disable()
+        instrument.reset()
+
+
+def test_solver_counters():
+    """
+    The solver paths of compound_interest_rate are counted.
+    """
+    instrument.enable()
+    instrument.reset()
+    try:
+        ci = ut.compound_interest(100_000, 0.05, 500, 12, 20)
+        ut.compound_interest_rate(100_000, ci, 500, 12, 20)
+        ut.compound_interest_rate(100_000, ci, 500, 12, 20, method="bracket")
+        stats = instrument.snapshot()
+    finally:
+        instrument.disable()
+        instrument.reset()
+
+    counters = stats["counters"]
+    assert counters["compound_interest_rate: roots"] == 1
+    assert counters["compound_interest_rate: bracket"] == 1
+    assert counters["compound_interest_rate: candidate root found"] == 1
+    assert counters["compound_interest_rate_batch: problems"] == 1
+    assert counters["compound_interest_rate_batch: iterations"] > 0
+    assert sum(stats["histograms"]["compound_interest_rate: error"]["counts"]) == 1
@@ -0,0 +1,55 @@
+import loan
+import numpy as np
+import pytest
+
+TOL = 1e-6  # tolerance
+
+INSTALLMENTS = [500, 2_000, 3_000]
+LOAN_BALANCES = [10_000, 100_000, 500_000]
+RATES = [0, 0.02, 0.04, 0.1]
+
+
+def test_amortization_schedule():
+    """
+    Compare the schedules of a batch of loans to repaying them installment by
+    installment until the owed amount is negative.
+    """
+    for ipy in [1, 4, 12]:  # installments per year
+        lb, rate, inst = np.meshgrid(LOAN_BALANCES, RATES, INSTALLMENTS, indexing="ij")
+        feasible = inst > ((1 + rate) ** (1 / ipy) - 1) * lb
+        lb, rate, inst = lb[feasible], rate[feasible], inst[feasible]
+        schedule = loan.amortization_schedule(lb, rate, inst, ipy)
+        months = loan.payoff_time(lb, rate, inst, ipy)
+
+        for i in range(len(lb)):
+            r = (1 + rate[i]) ** (1 / ipy) - 1
+            owed = lb[i]
+            k = 0
+            assert abs(schedule["owed"][i, k] - owed) < TOL
+            while owed >= 0:
+                interest = r * owed
+                owed -= inst[i] - interest
+                k += 1
+
+                assert abs(schedule["interest"][i, k - 1] - interest) < TOL
+                assert abs(schedule["principal"][i, k - 1] - (inst[i] - interest)) < TOL
+                assert abs(schedule["owed"][i, k] - owed) < TOL
+
+            assert abs(months[i] - k / ipy * 12) < TOL
+            assert schedule["owed"][i].count() == k + 1
+            assert schedule["interest"][i].count() == k
+
+
+def test_installment_too_small():
+    """
+    The first year's interest must be covered.
+    """
+    with pytest.raises(ValueError):
+        loan.payoff_time(500_000, 0.06, 2_000, 12)
+    with pytest.raises(ValueError):
+        loan.amortization_schedule(500_000, [0.02, 0.06], 2_000, 12)
+    with pytest.raises(ValueError, match="at least 30000.0 in the first year"):
+        loan.payoff_time(500_000, 0.06, 2_000, 12)
+    with pytest.raises(ValueError, match="more than 2000.00 per installment"):
+        # covers the interest but never the principal
+        loan.payoff_time(100_000, 0.02, 2_000, 1)
@@ -0,0 +1,27 @@
+import manifest
+import utils as ut
+
+
+def test_is_up_to_date(tmp_path):
+    """
+    A report is up to date as long as parameters, code and outputs are unchanged.
+    """
+    path = str(tmp_path / "manifest.json")
+    output = tmp_path / "report.txt"
+    output.write_text("report")
+    params = {"rates": [0.05, 0.06], "inflation": 0.03}
+    code = manifest.code_version(ut)
+
+    assert not manifest.is_up_to_date("report", params, code, path=path)
+    manifest.record("report", params, code, [str(output)], path=path)
+    assert manifest.is_up_to_date("report", params, code, path=path)
+    assert manifest.is_up_to_date("report", dict(reversed(params.items())), code, path)
+
+    assert not manifest.is_up_to_date(
+        "report", {**params, "inflation": 0.02}, code, path
+    )
+    assert not manifest.is_up_to_date(
+        "report", params, manifest.code_version(manifest), path
+    )
+    output.unlink()
+    assert not manifest.is_up_to_date("report", params, code, path=path)
@@ -0,0 +1,83 @@
+import grid
+import montecarlo as mc
+import numpy as np
+import pytest
+import utils as ut
+
+TOL = 1e-6  # relative tolerance
+
+
+def test_simulate_deterministic():
+    """
+    Without volatility, every path must follow compound_interest during the growth
+    years and be consumed exactly by the monthly purchasing power.
+    """
+    for distribution in ["lognormal", "normal"]:
+        for rate in [0, 0.03, 0.07]:
+            for gy, cy in [(0, 10), (10, 20), (30, 40)]:
+                paths = mc.simulate(
+                    100_000,
+                    1_000,
+                    gy,
+                    cy,
+                    rate,
+                    0,
+                    0.03,
+                    n_paths=5,
+                    seed=0,
+                    distribution=distribution,
+                )
+                eb = ut.compound_interest(100_000, rate, 1_000, 12, gy)
+
+                assert np.all(np.abs(paths["end balance"] / eb - 1) < TOL)
+                assert np.all(np.abs(paths["final balance"]) < TOL * eb)
+                assert not paths["depleted"].any()
+
+
+def test_simulate_chunks():
+    """
+    For a fixed seed, the chunk size must not change the result.
+    """
+    kwargs = dict(n_paths=1_000, seed=42)
+    p1 = mc.simulate(50_000, 500, 10, 20, 0.06, 0.15, 0.02, chunk_size=1_000, **kwargs)
+    p2 = mc.simulate(50_000, 500, 10, 20, 0.06, 0.15, 0.02, chunk_size=77, **kwargs)
+
+    for name in p1:
+        assert np.array_equal(p1[name], p2[name])
+
+
+def test_simulate_mean():
+    """
+    The mean end balance of lognormal returns must be close to the deterministic one.
+    """
+    paths = mc.simulate(100_000, 0, 10, 10, 0.07, 0.15, 0.02, n_paths=50_000, seed=1)
+    eb = ut.compound_interest(100_000, 0.07, 0, 12, 10)
+
+    assert abs(paths["end balance"].mean() / eb - 1) < 0.02
+
+
+def test_summarize_grid():
+    """
+    Every grid row gets percentiles and a depletion probability.
+    """
+    columns = grid.etf_grid([0, 1_000], [100_000], [0.05, 0.07], [10], [20], 0.03)
+    summary = mc.summarize_grid(columns, 0.15, 0.03, n_paths=1_000, seed=0)
+
+    assert set(summary) == {
+        "end balance p5",
+        "end balance p50",
+        "end balance p95",
+        "final balance p5",
+        "final balance p50",
+        "final balance p95",
+        "depletion probability",
+    }
+    assert np.all(summary["end balance p5"] <= summary["end balance p50"])
+    assert np.all(summary["end balance p50"] <= summary["end balance p95"])
+    p = summary["depletion probability"]
+    assert np.all((0 <= p) & (p <= 1))
+
+
+def test_unknown_distribution():
+    with pytest.raises(ValueError):
+        mc.simulate(0, 100, 1, 1, 0.05, 0.1, 0.02, n_paths=1, distribution="t")
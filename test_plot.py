@@ -0,0 +1,34 @@
+import numpy as np
+import plot
+
+
+def test_figure_reuse():
+    """
+    Reusing a figure removes the curves and legends of the previous report.
+    """
+    x = np.arange(10)
+    ys = np.array([x**2, 2 * x])
+    for title in ["first", "second"]:
+        fig, ax = plot.figure(2, title)
+        plot.curves(ax[0], x, ys)
+        plot.curves(ax[1], [x[:5], x], [x[:5], 3 * x], ["short", "long"])
+        assert fig.get_suptitle() == title
+        assert len(ax[0].collections) == 1 and len(ax[1].collections) == 1
+        assert len(ax[1].get_legend().get_texts()) == 2
+        assert ax[0].get_legend() is None
+        # the axes limits contain the curves of this report only
+        assert abs(ax[0].dataLim.y1 - 81) < 1e-12
+        assert abs(ax[1].dataLim.y1 - 27) < 1e-12
+    assert plot.figure(2, "third")[0] is fig
+
+
+def test_large_legend():
+    """
+    No legend is drawn for more than MAX_LEGEND_ENTRIES curves.
+    """
+    n = plot.MAX_LEGEND_ENTRIES + 1
+    x = np.arange(3)
+    fig, ax = plot.figure(1, "many")
+    plot.curves(ax[0], x, np.ones((n, 3)), [str(i) for i in range(n)])
+    assert len(ax[0].collections[0].get_segments()) == n
+    assert ax[0].get_legend() is None
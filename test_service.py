@@ -0,0 +1,156 @@
+import asyncio
+import json
+import loan
+import service
+import utils as ut
+
+TOL = 1e-6  # tolerance
+
+
+async def post(port: int, path: str, args: dict) -> tuple[int, dict]:
+    """
+    Send one request on a new connection and return the status and the response.
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(args).encode()
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+        f"Connection: close\r\n\r\n".encode() + body
+    )
+    status = int((await reader.readline()).split()[1])
+    response = (await reader.read()).split(b"\r\n\r\n", 1)[1]
+    writer.close()
+    return status, json.loads(response)
+
+
+def run(*waves: list[tuple[str, dict]], **kwargs) -> tuple[list, dict]:
+    """
+    Send the requests of each wave concurrently to a new service, one wave after
+    the other. Returns the responses and the statistics of the service.
+    """
+
+    async def main():
+        s = service.Service(**kwargs)
+        server = await s.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        responses = list()
+        async with server:
+            for requests in waves:
+                responses += await asyncio.gather(*[post(port, *r) for r in requests])
+        return responses, s.info()
+
+    return asyncio.run(main())
+
+
+def test_batching():
+    """
+    Concurrent requests are answered correctly from few vectorized batches.
+    """
+    requests = [
+        (
+            "/compound_interest",
+            dict(
+                initial_balance=sb,
+                annual_interest_rate=r,
+                regular_contribution=500,
+                contributions_per_year=12,
+                years=y,
+            ),
+        )
+        for sb in [0, 100_000]
+        for r in [0, 0.03, 0.07]
+        for y in [1, 10, 30]
+    ]
+    requests += [
+        (
+            "/monthly_purchasing_power",
+            dict(
+                start_balance=500_000,
+                years_to_consume=y,
+                annual_rate_of_return=0.05,
+                annual_rate_of_inflation=0.02,
+            ),
+        )
+        for y in [10, 20, 30]
+    ]
+    responses, info = run(requests, window=0.05)
+
+    for (path, args), (status, response) in zip(requests, responses):
+        assert status == 200
+        function = getattr(ut, path[1:])
+        assert abs(response["result"] - function(**args)) < TOL
+    assert info["requests"] == len(requests)
+    assert info["batches"] == 2
+
+
+def test_endpoints():
+    """
+    Rates, values today and repayments match the direct computations; errors are
+    reported per request and repeated requests come from the cache.
+    """
+    K_NP = ut.compound_interest(100_000, 0.05, 500, 12, 20)
+    rep = dict(
+        loan_balance=10_000,
+        annual_interest_rate=0.1,
+        regular_installment=200,
+        installments_per_year=12,
+    )
+    requests = [
+        (
+            "/compound_interest_rate",
+            dict(
+                initial_balance=100_000,
+                final_balance=K_NP,
+                regular_contribution=500,
+                contributions_per_year=12,
+                years=20,
+            ),
+        ),
+        ("/value_today", dict(x=100, years=30, annual_rate_of_inflation=0.03)),
+        ("/rep", rep),
+        ("/rep", {**rep, "installments_per_year": 4, "regular_installment": 600}),
+        ("/rep", {**rep, "regular_installment": 10}),
+        ("/rep", {**rep, "years": 1}),
+        ("/unknown", rep),
+    ]
+    responses, info = run(requests, requests[:2])
+
+    assert abs(responses[0][1]["result"]["rate"] - 0.05) < TOL
+    assert abs(responses[1][1]["result"] - ut.value_today(100, 30, 0.03)) < TOL
+    for (_, args), (status, response) in zip(requests[2:4], responses[2:4]):
+        owed = loan.amortization_schedule(**args)["owed"].compressed()
+        assert status == 200
+        assert response["result"]["months"] == loan.payoff_time(**args)
+        assert response["result"]["owed"] == owed.tolist()
+    assert [status for status, _ in responses[4:7]] == [400, 400, 404]
+    assert info["cache hits"] == 2
+
+
+def test_errors(monkeypatch):
+    """
+    Non-finite results are rejected and unexpected errors answered with status 500.
+    """
+
+    def fail(args):
+        raise OverflowError("too large")
+
+    monkeypatch.setitem(service.ENDPOINTS, "/fail", (["x"], fail))
+    mpp = dict(
+        start_balance=100_000,
+        years_to_consume=0,
+        annual_rate_of_return=0.05,
+        annual_rate_of_inflation=0.03,
+    )
+    responses, info = run(
+        [("/monthly_purchasing_power", mpp), ("/fail", {"x": 1})],
+        [("/monthly_purchasing_power", mpp)],
+    )
+    # the MPP of zero consume years is infinite
+    assert responses[0] == (
+        400,
+        {"error": "The result is not finite for these arguments."},
+    )
+    assert responses[1] == (500, {"error": "OverflowError: too large"})
+    # non-finite results are not cached
+    assert responses[2] == responses[0]
+    assert info["cache hits"] == 0 and info["cache size"] == 0
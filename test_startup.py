@@ -0,0 +1,54 @@
+import re
+import subprocess
+import sys
+
+# modules that must only be imported on first use
+HEAVY_MODULES = ["matplotlib", "numpy.polynomial", "pandas", "scipy", "tabulate"]
+# import time of each module on top of numpy, which is always needed (microseconds)
+BUDGET_US = 100_000
+# the fastest of several imports is compared with the budget, so that the load of
+# the machine does not fail the test
+RUNS = 5
+MODULES = ["etf", "main", "utils"]
+
+
+def import_times(module: str) -> dict[str, int]:
+    """
+    The cumulative import time in microseconds of every module that is imported by
+    `import module`, as reported by python -X importtime.
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    times = dict()
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s+(\S+)", line)
+        if match:
+            times[match.group(2)] = int(match.group(1))
+    return times
+
+
+def test_no_heavy_imports():
+    """
+    Importing the modules must not import the heavy dependencies.
+    """
+    for module in MODULES:
+        times = import_times(module)
+        for heavy in HEAVY_MODULES:
+            assert heavy not in times, f"{module} imports {heavy}"
+
+
+def test_import_time_budget():
+    """
+    Apart from numpy, importing a module must stay within the startup budget.
+    """
+    for module in MODULES:
+        own_time = min(
+            times[module] - times.get("numpy", 0)
+            for times in (import_times(module) for _ in range(RUNS))
+        )
+
+        assert own_time < BUDGET_US, f"import {module} took {own_time / 1e3:.0f} ms"
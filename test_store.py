@@ -0,0 +1,38 @@
+import numpy as np
+import store
+
+
+def test_save_load_columns(tmp_path):
+    """
+    Store columns, load them memory-mapped and compare. Non-numeric columns are
+    skipped.
+    """
+    columns = {
+        "rate": np.array([0.05, 0.07, 0.07]),
+        "growth years": np.array([10, 30, 20]),
+        "net MPP (today)": [1.5, 2.5, 3.5],
+        "label": ["a", "b", "c"],
+    }
+    store.save_columns(tmp_path / "test.columns", columns)
+    loaded = store.load_columns(tmp_path / "test.columns")
+
+    assert list(loaded) == ["rate", "growth years", "net MPP (today)"]
+    for name, values in loaded.items():
+        assert isinstance(values, np.memmap)
+        assert np.array_equal(values, columns[name])
+
+
+def test_select(tmp_path):
+    """
+    Select the rows matching all conditions.
+    """
+    columns = {
+        "rate": np.array([0.05, 0.07, 0.07, 0.07]),
+        "growth years": np.array([30, 30, 20, 30]),
+        "end balance": np.array([1.0, 2.0, 3.0, 4.0]),
+    }
+    store.save_columns(tmp_path / "test.columns", columns)
+    loaded = store.load_columns(tmp_path / "test.columns")
+    selected = store.select(loaded, {"rate": 0.07, "growth years": 30})
+
+    assert selected["end balance"].tolist() == [2.0, 4.0]
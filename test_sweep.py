@@ -0,0 +1,85 @@
+import grid
+import numpy as np
+import pytest
+import sweep
+
+AXES = dict(
+    contributions=[0, 500, 1000],
+    start_balances=[0, 50_000, 100_000, 200_000],
+    rates=[0.05, 0.06, 0.07],
+    growth_years=[10, 20],
+    consume_years=[20, 30],
+)
+
+
+def test_etf_sweep(tmp_path):
+    """
+    The sweep must agree with etf_grid for every inflation, for all chunk sizes.
+    """
+    inflations = [0.02, 0.03]
+    for chunk_size in [1, 7, 100, 1_000]:
+        columns = sweep.etf_sweep(
+            str(tmp_path / str(chunk_size)),
+            **AXES,
+            inflations=inflations,
+            chunk_size=chunk_size,
+        )
+        for i, inflation in enumerate(inflations):
+            expected = grid.etf_grid(**AXES, inflation=inflation)
+            for name, values in expected.items():
+                assert np.array_equal(columns[name][i :: len(inflations)], values)
+
+
+def test_resume(tmp_path):
+    """
+    An interrupted sweep continues after the last completed chunk.
+    """
+    axes = {"x": np.arange(10).tolist(), "y": [1.0, 2.0]}
+    calls = list()
+
+    def compute_rows(rows):
+        calls.append(len(rows["x"]))
+        if len(calls) == 4:
+            raise KeyboardInterrupt
+        return {**rows, "z": rows["x"] * rows["y"]}
+
+    path = str(tmp_path / "sweep")
+    with pytest.raises(KeyboardInterrupt):
+        sweep.sweep(path, axes, compute_rows, chunk_size=6)
+    assert sweep._load_progress(path)["done"] == 3
+
+    columns = sweep.sweep(path, axes, compute_rows, chunk_size=6)
+    # the chunks 3 (interrupted) and 4 are computed after resuming
+    assert len(calls) == 5
+    rows = grid.cartesian(axes)
+    assert np.array_equal(columns["z"], rows["x"] * rows["y"])
+    assert isinstance(columns["z"], np.memmap)
+
+    # nothing is computed for a completed sweep, everything for new parameters
+    sweep.sweep(path, axes, compute_rows, chunk_size=6)
+    assert len(calls) == 5
+    sweep.sweep(path, axes, compute_rows, params={"a": 1}, chunk_size=6)
+    assert len(calls) == 9
+
+
+def test_resume_code_version(tmp_path):
+    """
+    A sweep interrupted before the code changed starts over.
+    """
+    axes = {"x": np.arange(10).tolist()}
+
+    def old(rows):
+        if rows["x"][0] > 0:
+            raise KeyboardInterrupt
+        return {**rows, "z": rows["x"] * 2}
+
+    def new(rows):
+        return {**rows, "z": rows["x"] * 3}
+
+    path = str(tmp_path / "sweep")
+    with pytest.raises(KeyboardInterrupt):
+        sweep.sweep(path, axes, old, chunk_size=5)
+    assert sweep._load_progress(path)["done"] == 1
+
+    columns = sweep.sweep(path, axes, new, chunk_size=5)
+    assert np.array_equal(columns["z"], np.arange(10) * 3)
@@ -0,0 +1,91 @@
+from tabulate import tabulate
+import io
+import numpy as np
+import table
+
+COLUMNS = {
+    "contribution": np.array([0, 500, 3000, 12]),
+    "start balance": np.array([0.0, 50.0, 1234.4, 2000.0]),
+    "rate": np.array([0.05, 0.06, 0.07, 0.065]),
+    "net MPP": np.array([-0.4, 12.5, 55897.2, 3.0]),
+}
+FORMATS = {"start balance": "{:.0f} k", "net MPP": "{:.0f}"}
+
+
+def formatted(columns, formats):
+    return {
+        name: [formats.get(name, "{}").format(x) for x in values.tolist()]
+        for name, values in columns.items()
+    }
+
+
+def test_write_table():
+    """
+    Compare the streamed table to the table of tabulate for all chunk sizes.
+    """
+    for tablefmt in ["grid", "psql"]:
+        expected = tabulate(
+            formatted(COLUMNS, FORMATS),
+            headers="keys",
+            tablefmt=tablefmt,
+            showindex=False,
+            disable_numparse=True,
+        )
+        for chunk_size in [1, 3, 10]:
+            f = io.StringIO()
+            table.write_table(
+                f, COLUMNS, formats=FORMATS, tablefmt=tablefmt, chunk_size=chunk_size
+            )
+
+            assert f.getvalue() == expected
+
+
+def test_write_table_right():
+    """
+    Right-aligned columns must match tabulate's alignment of numbers.
+    """
+    columns = {"year": np.array([1, 10, 100]), "owed": np.array([0.5, 10.25, -1.0])}
+    formats = {"owed": "{:.2f}"}
+    expected = tabulate(
+        formatted(columns, formats),
+        headers="keys",
+        tablefmt="psql",
+        showindex=False,
+        disable_numparse=True,
+        colalign=("right", "right"),
+    )
+    f = io.StringIO()
+    table.write_table(f, columns, formats=formats, tablefmt="psql", align="right")
+
+    assert f.getvalue() == expected
+
+
+def test_write_table_decimal():
+    """
+    Decimal alignment must match tabulate's parsing and alignment of numbers.
+    """
+    columns = {
+        "year": np.array([1, 10, 100, 2]),
+        "owed": np.array([500.0, 485.7812345, -0.0809765, 1e-7]),
+        "rate (%)": np.array(["-0.6", "13", "12.5", "2.00010 (err: 1.2e-02 k€)"]),
+        "rate": np.array([0.05, 0.055, 0.06, 0.1]),
+    }
+    formats = {"owed": "{:g}", "rate": "{:g}"}
+    expected = tabulate(
+        columns,
+        headers="keys",
+        tablefmt="psql",
+        showindex=False,
+    )
+    for chunk_size in [1, 3, 10]:
+        f = io.StringIO()
+        table.write_table(
+            f,
+            columns,
+            formats=formats,
+            tablefmt="psql",
+            align="decimal",
+            chunk_size=chunk_size,
+        )
+
+        assert f.getvalue() == expected
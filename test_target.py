@@ -0,0 +1,101 @@
+import grid
+import numpy as np
+import pytest
+import target as tg
+
+TOL = 1e-6  # tolerance
+
+
+def net_mpp_today(K_0, r, m, gy, cy, q, tax):
+    rows = grid.etf_rows(
+        {
+            "contribution": np.atleast_1d(m),
+            "start balance": np.atleast_1d(K_0),
+            "rate": np.atleast_1d(r),
+            "growth years": np.atleast_1d(gy),
+            "consume years": np.atleast_1d(cy),
+        },
+        q,
+        tax=tax,
+    )
+    return rows["net MPP (today)"][0]
+
+
+def test_required_contribution_flat():
+    """
+    With the flat tax, the required contribution must reach the target exactly.
+    """
+    for K_0, r, gy, cy, q in [
+        (0, 0.05, 10, 20, 0.02),
+        (100_000, 0.07, 30, 40, 0.03),
+        (50_000, 0.0, 20, 30, 0.0),
+        (200_000, 0.06, 5, 30, 0.03),
+    ]:
+        m = tg.required_contribution(2_000, K_0, r, gy, cy, q)
+        assert m > 0
+        assert abs(net_mpp_today(K_0, r, m, gy, cy, q, "flat") - 2_000) < TOL
+
+    # the start balance alone is enough
+    assert tg.required_contribution(100, 1_000_000, 0.05, 10, 30, 0.02) == 0
+    # no growth years
+    assert tg.required_contribution(2_000, 0, 0.05, 0, 30, 0.02) == np.inf
+
+
+def test_required_contribution_german():
+    """
+    With the German tax, the required contribution must reach the target and a
+    contribution smaller by the tolerance must not.
+    """
+    K_0 = np.array([0, 100_000, 500_000, 2_000_000])
+    r = np.array([0.05, 0.07])[:, None]
+    m = tg.required_contribution(2_000, K_0, r, 20, 30, 0.03, tax="german")
+    flat = tg.required_contribution(2_000, K_0, r, 20, 30, 0.03)
+    assert m.shape == (2, 4)
+    assert np.all(m <= flat)
+    for i, j in np.ndindex(m.shape):
+        if m[i, j] == 0:
+            assert net_mpp_today(K_0[j], r[i, 0], 0, 20, 30, 0.03, "german") >= 2_000
+            continue
+        assert net_mpp_today(K_0[j], r[i, 0], m[i, j], 20, 30, 0.03, "german") >= 2_000
+        below = m[i, j] - 0.01
+        assert net_mpp_today(K_0[j], r[i, 0], below, 20, 30, 0.03, "german") < 2_000
+
+    with pytest.raises(ValueError):
+        tg.required_contribution(2_000, 0, 0.05, 20, 30, 0.03, tax="none")
+
+
+def test_contribution_grid():
+    """
+    The grid must have one row per combination and agree with scalar calls.
+    """
+    columns = tg.contribution_grid(
+        1_500, [0, 100_000], [0.05, 0.07], [10, 20], [20, 30], [0.02, 0.03]
+    )
+    assert len(columns["contribution"]) == 32
+    for i in range(32):
+        expected = tg.required_contribution(
+            1_500,
+            columns["start balance"][i],
+            columns["rate"][i],
+            columns["growth years"][i],
+            columns["consume years"][i],
+            columns["inflation"][i],
+        )
+        assert abs(columns["contribution"][i] - expected) < TOL
+
+
+def test_required_contribution_german_scalar(monkeypatch):
+    """
+    Scalar arguments give a scalar, also if the flat-tax contribution does not
+    bracket the solution.
+    """
+    args = (2_000, 100_000, 0.05, 20, 30, 0.03)
+    m = tg.required_contribution(*args, tax="german")
+    assert np.ndim(m) == 0
+    assert net_mpp_today(*args[1:3], m, *args[3:], "german") < 2_000 + 1
+    assert net_mpp_today(*args[1:3], m, *args[3:], "german") >= 2_000
+
+    # a flat tax of -50% makes the flat-tax contribution too small
+    monkeypatch.setattr(tg.ut, "subtract_gains_tax", lambda x: x * 1.5)
+    assert tg.required_contribution(*args) < m
+    assert abs(tg.required_contribution(*args, tax="german") - m) < 0.01
@@ -0,0 +1,114 @@
+import grid
+import numpy as np
+import pytest
+import tax as tx
+import utils as ut
+
+TOL = 1e-6  # tolerance
+
+
+def test_german_tax_vorabpauschale():
+    """
+    One year without contributions: only the Vorabpauschale is taxed.
+    """
+    result = tx.german_tax(
+        initial_balance=100_000,
+        annual_interest_rate=0.07,
+        regular_contribution=0,
+        growth_years=1,
+        consume_years=0,
+        annual_rate_of_inflation=0.03,
+    )
+    vorabpauschale = 100_000 * 0.7 * tx.BASE_RATE
+    expected = (vorabpauschale * 0.7 - tx.ALLOWANCE) * tx.TAX_RATE
+    assert abs(result["tax during growth"] - expected) < TOL
+    assert abs(result["tax during consumption"]) < TOL
+    assert abs(result["gross withdrawals"]) < TOL
+
+
+def test_german_tax_total():
+    """
+    Without allowance and partial exemption, all gains are taxed exactly once: the
+    total tax is TAX_RATE times the withdrawals minus the invested amount.
+    """
+    for K_0, r, m, gy, cy in [
+        (100_000, 0.07, 0, 10, 20),
+        (0, 0.05, 1_000, 20, 30),
+        (50_000, 0.06, 500, 7, 13),
+        (200_000, -0.02, 0, 5, 10),
+    ]:
+        result = tx.german_tax(
+            initial_balance=K_0,
+            annual_interest_rate=r,
+            regular_contribution=m,
+            growth_years=gy,
+            consume_years=cy,
+            annual_rate_of_inflation=0.03,
+            allowance=0,
+            partial_exemption=0,
+        )
+        invested = K_0 + m * 12 * gy
+        gains = result["gross withdrawals"] - invested
+        total = result["tax during growth"] + result["tax during consumption"]
+        assert abs(total - max(gains, 0) * tx.TAX_RATE) < TOL * invested
+
+
+def test_german_tax_allowance():
+    """
+    Below the allowance, no tax is paid and the net MPP is the MPP.
+    """
+    result = tx.german_tax(
+        initial_balance=10_000,
+        annual_interest_rate=0.05,
+        regular_contribution=0,
+        growth_years=10,
+        consume_years=30,
+        annual_rate_of_inflation=0.02,
+    )
+    mpp = ut.monthly_purchasing_power(
+        ut.compound_interest(10_000, 0.05, 0, 12, 10), 30, 0.05, 0.02
+    )
+    assert abs(result["tax during growth"]) < TOL
+    assert abs(result["tax during consumption"]) < TOL
+    assert abs(result["net MPP"] - mpp) < TOL
+
+
+def test_german_tax_broadcast():
+    """
+    Arrays of scenarios must give the same results as scalar calls.
+    """
+    K_0 = np.array([[0], [100_000], [500_000]])
+    r = np.array([0.05, 0.07])
+    gy = np.array([10, 20])[:, None, None]
+    result = tx.german_tax(K_0, r, 1_000, gy, 30, 0.03)
+    assert result["net MPP"].shape == (2, 3, 2)
+    for i, j, k in np.ndindex(result["net MPP"].shape):
+        scalar = tx.german_tax(K_0[j, 0], r[k], 1_000, gy[i, 0, 0], 30, 0.03)
+        for name, values in result.items():
+            assert abs(values[i, j, k] - scalar[name]) < TOL * max(1, scalar[name])
+
+    with pytest.raises(ValueError):
+        tx.german_tax(0, 0.05, 1_000, 10, 30, 0.03, contributions_per_year=5)
+
+
+def test_etf_grid_german_tax():
+    """
+    The net MPP of the grid with German tax must be the one of german_tax and at
+    least the one with the flat tax (of which only gains are taxed).
+    """
+    args = ([0, 1_000], [0, 200_000], [0.05, 0.07], [10, 20], [20, 30], 0.03)
+    flat = grid.etf_grid(*args, workers=1)
+    german = grid.etf_grid(*args, workers=1, tax="german")
+    expected = tx.german_tax(
+        german["start balance"],
+        german["rate"],
+        german["contribution"],
+        german["growth years"],
+        german["consume years"],
+        0.03,
+    )["net MPP"]
+    assert np.max(np.abs(german["net MPP"] - expected)) < TOL
+    assert np.all(german["net MPP"] >= flat["net MPP"] - TOL)
+
+    with pytest.raises(ValueError):
+        grid.etf_grid(*args, workers=1, tax="none")
@@ -1,3 +1,4 @@
+import numpy as np
 import utils as ut
 import sys
 
@@ -46,6 +47,101 @@ def test_compound_interest():
                         assert abs(ci - m) < TOL
 
 
+def test_compound_interest_broadcast():
+    """
+    Evaluate compound_interest for all rates and years in a single broadcast call and
+    compare every entry to a manual computation.
+    """
+    rates = np.array(RATES)[:, np.newaxis]
+    years = np.array(YEARS)[np.newaxis, :]
+    for sb in START_BALANCES:
+        for cpy in [2, 4, 12]:  # contributions per year
+            ci = ut.compound_interest(sb, rates, 100, cpy, years)
+
+            assert ci.shape == (len(RATES), len(YEARS))
+            for i, rate in enumerate(RATES):
+                for j, y in enumerate(YEARS):
+                    regular_rate = (1 + rate) ** (1 / cpy)
+                    m = sb
+                    for _ in range(y * cpy):
+                        m *= regular_rate
+                        m += 100
+
+                    assert abs(ci[i, j] - m) < TOL
+
+
+def test_compound_interest_trajectory():
+    """
+    Compare the balances after each contribution for a batch of rates and start
+    balances to a manual computation.
+    """
+    for y in [1, 10, 30]:
+        for cpy in [1, 4, 12]:  # contributions per year
+            trajectory = ut.compound_interest_trajectory(
+                np.array(START_BALANCES)[:, np.newaxis],
+                np.array(RATES)[np.newaxis, :],
+                100,
+                cpy,
+                y,
+            )
+
+            assert trajectory.shape == (len(START_BALANCES), len(RATES), y * cpy + 1)
+            for i, sb in enumerate(START_BALANCES):
+                for j, rate in enumerate(RATES):
+                    regular_rate = (1 + rate) ** (1 / cpy)
+                    m = sb
+                    assert abs(trajectory[i, j, 0] - m) < TOL
+                    for l in range(1, y * cpy + 1):
+                        m *= regular_rate
+                        m += 100
+
+                        assert abs(trajectory[i, j, l] - m) < TOL
+
+
+def test_compound_interest_schedule():
+    """
+    Compare a schedule of rates and contributions to a manual computation.
+    """
+    schedules = [
+        ([0.07, 0.04], [500, 1000], [15, 10]),
+        ([0.05, 0, -0.02], [100, 0, 300], [1, 2, 3]),
+        ([0.03], [200], [30]),
+    ]
+    for sb in START_BALANCES:
+        for rates, mcs, ys in schedules:
+            for cpy in [2, 4, 12]:  # contributions per year
+                ci = ut.compound_interest_schedule(sb, rates, mcs, cpy, ys)
+
+                # compute the compount interest "manually"
+                m = sb
+                for rate, mc, y in zip(rates, mcs, ys):
+                    regular_rate = (1 + rate) ** (1 / cpy)
+                    for _ in range(y * cpy):
+                        m *= regular_rate
+                        m += mc
+
+                assert abs(ci - m) < TOL
+
+
+def test_compound_interest_schedule_broadcast():
+    """
+    Evaluate many two-segment schedules in one call and compare them to single calls.
+    """
+    rates = np.stack(np.meshgrid(RATES, RATES, indexing="ij"), axis=-1)
+    mcs = np.array([500, 1000])
+    ys = np.array([15, 10])
+    ci = ut.compound_interest_schedule(100_000, rates, mcs, 12, ys)
+
+    assert ci.shape == (len(RATES), len(RATES))
+    for i, j in np.ndindex(ci.shape):
+        expected = ut.compound_interest_schedule(100_000, rates[i, j], mcs, 12, ys)
+        assert abs(ci[i, j] - expected) < TOL
+    # a single segment is the same as compound_interest
+    for rate in RATES:
+        ci = ut.compound_interest_schedule(100_000, [rate], [500], 12, [20])
+        assert abs(ci - ut.compound_interest(100_000, rate, 500, 12, 20)) < TOL
+
+
 def test_compound_interest_rate():
     """
     Compute a compound interest final balance and use compound_interest_rate to get the
@@ -62,6 +158,78 @@ def test_compound_interest_rate():
                         assert abs(rate - cir[0]) < TOL
 
 
+def test_compound_interest_rate_bracket():
+    """
+    Same as test_compound_interest_rate but with the bracketed solver, which also
+    handles long horizons and negative rates.
+    """
+    for y in [1, 10, 20, 30, 50]:  # years
+        for rate in [-0.02, 0, 0.04, 0.05, 0.15]:
+            for sb in [0, 100_000]:  # start balance
+                for mc in [100, 500]:  # regular contributions
+                    for cpy in [2, 4, 12]:  # contributions per year
+                        ci = ut.compound_interest(sb, rate, mc, cpy, y)
+                        cir = ut.compound_interest_rate(
+                            sb, ci, mc, cpy, y, method="bracket"
+                        )
+
+                        assert abs(rate - cir[0]) < TOL
+                        assert cir[1] < 1e-2
+
+
+def test_compound_interest_rate_batch():
+    """
+    Solve for the rates of a whole grid of final balances in one call.
+    """
+    y, rate, sb, mc, cpy = np.meshgrid(
+        YEARS, RATES, START_BALANCES, MONTHLY_CONTRIBUTIONS, [2, 4, 12], indexing="ij"
+    )
+    ci = ut.compound_interest(sb, rate, mc, cpy, y)
+    rates, errors = ut.compound_interest_rate_batch(sb, ci, mc, cpy, y)
+
+    assert rates.shape == y.shape
+    assert np.all(np.abs(rate - rates) < TOL)
+    assert np.all(errors < 1e-2)
+
+
+def test_compound_interest_contribution():
+    """
+    Compute a compound interest final balance for a whole grid and solve for the
+    contributions that were used.
+    """
+    y, rate, sb, mc, cpy = np.meshgrid(
+        YEARS, RATES, START_BALANCES, MONTHLY_CONTRIBUTIONS, [2, 4, 12], indexing="ij"
+    )
+    ci = ut.compound_interest(sb, rate, mc, cpy, y)
+    contributions = ut.compound_interest_contribution(sb, ci, rate, cpy, y)
+
+    assert contributions.shape == y.shape
+    assert np.all(np.abs(mc - contributions) < TOL)
+
+
+def test_compound_interest_years():
+    """
+    Compute a compound interest final balance for a whole grid and solve for the
+    years that were used. Balances between two contributions round up to the next one.
+    """
+    y, rate, sb, mc, cpy = np.meshgrid(
+        YEARS, RATES, START_BALANCES, MONTHLY_CONTRIBUTIONS, [2, 4, 12], indexing="ij"
+    )
+    ci = ut.compound_interest(sb, rate, mc, cpy, y)
+    years = ut.compound_interest_years(sb, ci, rate, mc, cpy)
+
+    assert years.shape == y.shape
+    assert np.all(np.abs(y - years) < TOL)
+
+    # half a contribution more than after y years
+    years = ut.compound_interest_years(sb, ci + mc / 2, rate, mc, cpy)
+    assert np.all(np.ceil(years * cpy) == y * cpy + 1)
+
+    # a balance that decreases towards zero or a final balance before the start
+    assert np.isnan(ut.compound_interest_years(1000, 2000, -0.5, 10, 12))
+    assert np.isnan(ut.compound_interest_years(1000, 500, 0.05, 10, 12))
+
+
 def test_monthly_purchasing_power():
     """
     We do the actual balance computation of iteratively (i) consuming at the beginning
@@ -93,6 +261,115 @@ def test_monthly_purchasing_power():
                     assert abs(balance) < TOL
 
 
+def test_monthly_purchasing_power_broadcast():
+    """
+    Evaluate monthly_purchasing_power on a whole grid at once and compare every entry
+    to the month-by-month sum of the growing annuity.
+    """
+    sb, y, rate, inflation = np.meshgrid(
+        START_BALANCES, YEARS, RATES, INFLATIONS, indexing="ij"
+    )
+    mpp = ut.monthly_purchasing_power(sb, y, rate, inflation)
+
+    assert mpp.shape == sb.shape
+    for index in np.ndindex(sb.shape):
+        mi = ut.annual_to_monthly(inflation[index])
+        mr = ut.annual_to_monthly(rate[index])
+        K = 12 * y[index]
+        rs_cum = sum(mi ** (K - i) * mr**i for i in range(1, K + 1))
+
+        assert abs(mpp[index] - sb[index] * mr**K / rs_cum) < TOL
+
+
+def test_long_durations():
+    """
+    The placeholders of zero rates must not overflow (and warn) for long durations.
+    """
+    with np.errstate(all="raise"):
+        for years in [60, 100]:
+            mpp = ut.monthly_purchasing_power(1e6, years, 0.03, 0.03)
+            assert abs(mpp - 1e6 / (12 * years)) < TOL
+        assert abs(ut.compound_interest(1, 0.0, 1, 12, 800) - 9601) < TOL
+
+
+def test_required_start_balance():
+    """
+    The start balance needed for a monthly purchasing power yields that purchasing
+    power.
+    """
+    mpp, y, rate, inflation = np.meshgrid(
+        MONTHLY_CONTRIBUTIONS, YEARS, RATES, INFLATIONS, indexing="ij"
+    )
+    sb = ut.required_start_balance(mpp, y, rate, inflation)
+
+    assert sb.shape == mpp.shape
+    assert np.all(
+        np.abs(ut.monthly_purchasing_power(sb, y, rate, inflation) - mpp) < TOL
+    )
+
+
+def test_compound_interest_sensitivities():
+    """
+    Compare the analytic derivatives of compound_interest to central differences.
+    """
+    h = 1e-6
+    y, rate, sb, mc, cpy = np.meshgrid(
+        [1, 10, 30],
+        [-0.02, 0, 1e-9, 0.05],
+        [0, 100_000],
+        [0, 500],
+        [1, 12],
+        indexing="ij",
+    )
+    s = ut.compound_interest_sensitivities(sb, rate, mc, cpy, y)
+    ci = lambda sb, rate, mc, y: ut.compound_interest(sb, rate, mc, cpy, y)
+    differences = {
+        "rate": (ci(sb, rate + h, mc, y) - ci(sb, rate - h, mc, y)) / (2 * h),
+        "contribution": (ci(sb, rate, mc + h, y) - ci(sb, rate, mc - h, y)) / (2 * h),
+        "initial balance": (ci(sb + h, rate, mc, y) - ci(sb - h, rate, mc, y))
+        / (2 * h),
+        "years": (ci(sb, rate, mc, y + h) - ci(sb, rate, mc, y - h)) / (2 * h),
+    }
+
+    assert np.all(np.abs(s["value"] - ci(sb, rate, mc, y)) < TOL)
+    for name, difference in differences.items():
+        assert s[name].shape == y.shape
+        assert np.all(np.abs(s[name] - difference) < 1e-4 * (1 + np.abs(difference)))
+
+
+def test_monthly_purchasing_power_sensitivities():
+    """
+    Compare the analytic derivatives of monthly_purchasing_power to central
+    differences.
+    """
+    h = 1e-6
+    sb, y, rate, inflation = np.meshgrid(
+        [1_000, 100_000],
+        [1, 10, 30],
+        [0, 0.02, 0.02 + 1e-10, 0.07],
+        [0, 0.02],
+        indexing="ij",
+    )
+    s = ut.monthly_purchasing_power_sensitivities(sb, y, rate, inflation)
+    mpp = ut.monthly_purchasing_power
+    differences = {
+        "rate": (mpp(sb, y, rate + h, inflation) - mpp(sb, y, rate - h, inflation)),
+        "inflation": (
+            mpp(sb, y, rate, inflation + h) - mpp(sb, y, rate, inflation - h)
+        ),
+        "start balance": (
+            mpp(sb + h, y, rate, inflation) - mpp(sb - h, y, rate, inflation)
+        ),
+        "years": (mpp(sb, y + h, rate, inflation) - mpp(sb, y - h, rate, inflation)),
+    }
+
+    assert np.all(np.abs(s["value"] - mpp(sb, y, rate, inflation)) < TOL)
+    for name, difference in differences.items():
+        difference = difference / (2 * h)
+        assert s[name].shape == y.shape
+        assert np.all(np.abs(s[name] - difference) < 1e-4 * (1 + np.abs(difference)))
+
+
 def test_value_today():
     """
     Add inflation to today's value to see if that yields the original future value.
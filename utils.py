@@ -1,6 +1,5 @@
-from numpy.polynomial.polynomial import Polynomial
-from scipy.optimize import root_scalar
 import numpy as np
+import instrument
 
 
 def annual_to_monthly(rate: float) -> float:
@@ -11,28 +10,253 @@ def annual_to_monthly(rate: float) -> float:
 
 
 def compound_interest(
-    initial_balance: float,
-    annual_interest_rate: float,
-    regular_contribution: float,
+    initial_balance: float | np.ndarray,
+    annual_interest_rate: float | np.ndarray,
+    regular_contribution: float | np.ndarray,
+    contributions_per_year: int | np.ndarray,
+    years: int | np.ndarray,
+) -> float | np.ndarray:
+    """
+    Grow the current balance according to the rate and then add the next contribution.
+
+    All arguments can be arrays. They are broadcast against each other and the result
+    has the broadcast shape. Scalar arguments yield a scalar.
+
+    See README.md for a derivation.
+    """
+    K_0 = np.asarray(initial_balance, dtype=float)
+    r = np.asarray(annual_interest_rate, dtype=float)
+    m = np.asarray(regular_contribution, dtype=float)
+    P = np.asarray(contributions_per_year)
+    N = np.asarray(years)
+
+    # x = log(R) with R = 1 + r; expm1 avoids the cancellation in 1 - R^N and
+    # 1 - R^(1/P) for rates close to zero
+    x = np.log1p(r)
+    # a rate of zero would divide by zero: the geometric series is then just P * N
+    zero_rate = x == 0
+    x_safe = np.where(zero_rate, 1.0, x)
+    # the placeholder x_safe = 1 of zero rates may overflow for long durations
+    with np.errstate(over="ignore"):
+        series = np.where(zero_rate, P * N, np.expm1(N * x_safe) / np.expm1(x_safe / P))
+    return (K_0 * np.exp(N * x) + m * series)[()]
+
+
+def compound_interest_trajectory(
+    initial_balance: float | np.ndarray,
+    annual_interest_rate: float | np.ndarray,
+    regular_contribution: float | np.ndarray,
     contributions_per_year: int,
     years: int,
-) -> float:
+) -> np.ndarray:
     """
-    Grow the current balance according to the rate and then add the next contribution.
+    The balance after each contribution, starting with `initial_balance`.
+
+    The first three arguments can be arrays of scenarios. They are broadcast against
+    each other and the result has the shape (*scenarios, years * contributions_per_year
+    + 1). Every entry is computed in closed form (see README.md).
+    """
+    K_0 = np.asarray(initial_balance, dtype=float)[..., np.newaxis]
+    r = np.asarray(annual_interest_rate, dtype=float)[..., np.newaxis]
+    m = np.asarray(regular_contribution, dtype=float)[..., np.newaxis]
+    l = np.arange(years * contributions_per_year + 1)
+
+    # x_P = log(R_P): logarithmic rate per contribution period
+    x_P = np.log1p(r) / contributions_per_year
+    zero_rate = x_P == 0
+    x_safe = np.where(zero_rate, 1.0, x_P)
+    series = np.where(zero_rate, l, np.expm1(l * x_safe) / np.expm1(x_safe))
+    return K_0 * np.exp(l * x_P) + m * series
+
+
+def compound_interest_schedule(
+    initial_balance: float | np.ndarray,
+    annual_interest_rates: list[float] | np.ndarray,
+    regular_contributions: list[float] | np.ndarray,
+    contributions_per_year: int | np.ndarray,
+    years: list[int] | np.ndarray,
+) -> float | np.ndarray:
+    """
+    Like compound_interest, but with piecewise-constant rates and contributions.
+
+    The last axis of `annual_interest_rates`, `regular_contributions` and `years`
+    enumerates the segments of the schedule: segment i lasts years[..., i] years with
+    the rate annual_interest_rates[..., i] and the contribution
+    regular_contributions[..., i]. The final balance of each segment is the initial
+    balance of the next one, so the cost is proportional to the number of segments
+    and not to the number of periods.
+
+    The leading axes are broadcast against each other and against `initial_balance`
+    and `contributions_per_year`, which evaluates many schedules at once.
+    """
+    r, m, N = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(annual_interest_rates, dtype=float)),
+        np.atleast_1d(np.asarray(regular_contributions, dtype=float)),
+        np.atleast_1d(np.asarray(years)),
+    )
+    K = np.asarray(initial_balance, dtype=float)
+    for segment in range(r.shape[-1]):
+        K = compound_interest(
+            K, r[..., segment], m[..., segment], contributions_per_year, N[..., segment]
+        )
+    return np.asarray(K)[()]
+
+
+def _growth_series(
+    x: np.ndarray, P: np.ndarray, N: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The geometric series sum_{i=0}^{NP-1} exp(i x / P) and its derivative with
+    respect to x, where x = log(1 + r) is the logarithmic annual rate.
+
+    expm1 avoids the cancellation in (1 - R^N) / (1 - R^(1/P)) for small rates.
+    Close to x = 0, the derivative is replaced by its first order Taylor expansion.
+    """
+    NP = N * P
+    small = np.abs(N * x) < 1e-6
+    x_safe = np.where(small, 1.0, x)
+    # the placeholder x_safe = 1 of small rates may overflow for long durations
+    with np.errstate(over="ignore", invalid="ignore"):
+        num = np.expm1(N * x_safe)
+        den = np.expm1(x_safe / P)
+        series = np.where(small, NP * (1 + (NP - 1) * x / (2 * P)), num / den)
+        derivative = (
+            N * np.exp(N * x_safe) * den - num * np.exp(x_safe / P) / P
+        ) / den**2
+    derivative_0 = N * (NP - 1) / 2
+    derivative_1 = (NP - 1) * NP * (2 * NP - 1) / (6 * P**2)
+    derivative = np.where(small, derivative_0 + derivative_1 * x, derivative)
+    return series, derivative
+
+
+def _balance_and_derivative(
+    K_0: np.ndarray, x: np.ndarray, m: np.ndarray, P: np.ndarray, N: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The final balance of compound_interest and its derivative with respect to the
+    logarithmic annual rate x = log(1 + r).
+    """
+    series, derivative = _growth_series(x, P, N)
+    growth = np.exp(N * x)
+    return K_0 * growth + m * series, N * K_0 * growth + m * derivative
+
+
+def compound_interest_sensitivities(
+    initial_balance: float | np.ndarray,
+    annual_interest_rate: float | np.ndarray,
+    regular_contribution: float | np.ndarray,
+    contributions_per_year: int | np.ndarray,
+    years: int | np.ndarray,
+) -> dict[str, float | np.ndarray]:
+    """
+    The final balance of compound_interest together with its partial derivatives.
+
+    Returns
+        "value": the final balance,
+        "rate": the derivative with respect to the annual interest rate,
+        "contribution": the derivative with respect to the regular contribution,
+        "initial balance": the derivative with respect to the initial balance,
+        "years": the derivative with respect to the (continuous) number of years.
+
+    All arguments can be arrays. They are broadcast against each other.
 
     See README.md for a derivation.
     """
-    K_0 = initial_balance
-    r = annual_interest_rate
-    m = regular_contribution
-    P = contributions_per_year
-    N = years
+    K_0 = np.asarray(initial_balance, dtype=float)
+    r = np.asarray(annual_interest_rate, dtype=float)
+    m = np.asarray(regular_contribution, dtype=float)
+    P = np.asarray(contributions_per_year)
+    N = np.asarray(years)
 
-    R = 1 + r
-    if 1 - R ** (1 / P) == 0:
-        return K_0 + m * P * N
-    else:
-        return K_0 * R**N + m * (1 - R**N) / (1 - R ** (1 / P))
+    x = np.log1p(r)
+    value, derivative = _balance_and_derivative(K_0, x, m, P, N)
+    series = _growth_series(x, P, N)[0]
+    growth = np.exp(N * x)
+    # d/dN (K_0 e^(N x) + m expm1(N x) / expm1(x / P)) = x e^(N x) (K_0 + m / g)
+    zero_rate = x == 0
+    x_safe = np.where(zero_rate, 1.0, x)
+    d_years = np.where(
+        zero_rate,
+        m * P,
+        x_safe * growth * (K_0 + m / np.expm1(x_safe / P)),
+    )
+    return {
+        "value": value[()],
+        "rate": (derivative / (1 + r))[()],
+        "contribution": np.broadcast_to(series, value.shape)[()],
+        "initial balance": np.broadcast_to(growth, value.shape)[()],
+        "years": np.broadcast_to(d_years, value.shape)[()],
+    }
+
+
+def compound_interest_rate_batch(
+    initial_balance: float | np.ndarray,
+    final_balance: float | np.ndarray,
+    regular_contribution: float | np.ndarray,
+    contributions_per_year: int | np.ndarray,
+    years: int | np.ndarray,
+    max_iter: int = 100,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Solve compound_interest_rate for many (K_0, K_NP, m, P, N) tuples at once.
+
+    The arguments are broadcast against each other. The closed-form final balance is
+    increasing in x = log(1 + r). A bracket is searched for x and then refined with
+    Newton steps that use the analytic derivative. Steps leaving the bracket are
+    replaced by bisection steps. The cost does not depend on the number of periods.
+
+    Returns the rates and the absolute balance errors, both with the broadcast shape.
+    """
+    K_0, K_NP, m, P, N = np.broadcast_arrays(
+        np.asarray(initial_balance, dtype=float),
+        np.asarray(final_balance, dtype=float),
+        np.asarray(regular_contribution, dtype=float),
+        np.asarray(contributions_per_year),
+        np.asarray(years),
+    )
+
+    def f(x):
+        value, derivative = _balance_and_derivative(K_0, x, m, P, N)
+        return value - K_NP, derivative
+
+    # the largest x for which exp(N * x) does not overflow
+    x_max = 700 / np.maximum(N, 1)
+
+    # bracket [lo, hi] with f(lo) <= 0 <= f(hi)
+    lo = np.full(K_0.shape, -1.0)
+    hi = np.minimum(np.full(K_0.shape, 1.0), x_max)
+    for _ in range(6):
+        too_high = f(lo)[0] > 0
+        lo = np.where(too_high, 2 * lo, lo)
+        too_low = f(hi)[0] < 0
+        hi = np.where(too_low, np.minimum(2 * hi, x_max), hi)
+
+    x = np.clip(np.log1p(0.05), lo, hi)
+    active = np.ones(K_0.shape, dtype=bool)
+    instrument.count("compound_interest_rate_batch: problems", active.size)
+    for _ in range(max_iter):
+        value, derivative = f(x)
+        lo = np.where(value < 0, x, lo)
+        hi = np.where(value > 0, x, hi)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_new = x - value / derivative
+        bisect = ~((x_new > lo) & (x_new < hi))
+        x_new = np.where(bisect, (lo + hi) / 2, x_new)
+        if instrument.enabled():
+            instrument.count("compound_interest_rate_batch: iterations")
+            instrument.count(
+                "compound_interest_rate_batch: bisection steps",
+                np.count_nonzero(bisect & active),
+            )
+        active &= (value != 0) & (np.abs(x_new - x) > 1e-15 * (1 + np.abs(x)))
+        x = np.where(active, x_new, x)
+        if not active.any():
+            break
+
+    r = np.expm1(x)
+    error = np.abs(K_NP - compound_interest(K_0, r, m, P, N))
+    instrument.histogram("compound_interest_rate_batch: error", error)
+    return r[()], error[()]
 
 
 def compound_interest_rate(
@@ -41,13 +265,37 @@ def compound_interest_rate(
     regular_contribution: float,
     contributions_per_year: int,
     years: int,
+    method: str = "roots",
 ) -> tuple[float, float]:
     """
     The rate needed for `initial_balance` to grow to `final_balance` with the given
     contributions and within the given number of years.
 
+    With `method="roots"`, the rate is found among the roots of a polynomial of degree
+    N * P + 1. With `method="bracket"`, the closed-form balance is solved directly
+    (see compound_interest_rate_batch), which is much faster for many periods.
+
     See README.md for a derivation.
     """
+    instrument.count(f"compound_interest_rate: {method}")
+    if method == "bracket":
+        r, error = compound_interest_rate_batch(
+            initial_balance,
+            final_balance,
+            regular_contribution,
+            contributions_per_year,
+            years,
+        )
+        if error >= 1e-2:
+            _warn_no_rate(error)
+        return float(r), float(error)
+    elif method != "roots":
+        raise ValueError(f"Unknown method {method!r}. Use 'roots' or 'bracket'.")
+
+    # imported here since they are slow to import and only needed for this method
+    from numpy.polynomial.polynomial import Polynomial
+    from scipy.optimize import root_scalar
+
     K_0 = initial_balance
     K_NP = final_balance
     m = regular_contribution
@@ -70,6 +318,7 @@ def compound_interest_rate(
     rates = R_roots[R_roots > 1] - 1
 
     # try to find a suitable root
+    instrument.count("compound_interest_rate: candidate roots", len(rates))
     for r in rates:
         K_final = compound_interest(
             initial_balance=initial_balance,
@@ -80,9 +329,12 @@ def compound_interest_rate(
         )
         error = np.abs(final_balance - K_final)
         if error < 1e-2:
+            instrument.count("compound_interest_rate: candidate root found")
+            instrument.histogram("compound_interest_rate: error", error)
             return r, error
     else:
         # different attempt
+        instrument.count("compound_interest_rate: root_scalar fallback")
         r = root_scalar(poly, x0=1e-4, x1=0.1).root ** P - 1
 
         K_final = compound_interest(
@@ -94,20 +346,87 @@ def compound_interest_rate(
         )
 
         error = np.abs(final_balance - K_final)
+        instrument.histogram("compound_interest_rate: error", error)
         if error >= 1e-2:
-            print(
-                f"{compound_interest_rate.__name__}(): Did not find a suitable interest"
-                f" rate. Returning closest match with balance error {error:.3f}."
-            )
+            _warn_no_rate(error)
         return r, error
 
 
+def _warn_no_rate(error: float):
+    instrument.count("compound_interest_rate: no suitable rate")
+    print(
+        f"{compound_interest_rate.__name__}(): Did not find a suitable interest"
+        f" rate. Returning closest match with balance error {error:.3f}."
+    )
+
+
+def compound_interest_contribution(
+    initial_balance: float | np.ndarray,
+    final_balance: float | np.ndarray,
+    annual_interest_rate: float | np.ndarray,
+    contributions_per_year: int | np.ndarray,
+    years: int | np.ndarray,
+) -> float | np.ndarray:
+    """
+    The regular contribution needed for `initial_balance` to grow to `final_balance`
+    with the given rate and within the given number of years.
+
+    All arguments can be arrays. They are broadcast against each other.
+
+    See README.md for a derivation.
+    """
+    K_0 = np.asarray(initial_balance, dtype=float)
+    K_NP = np.asarray(final_balance, dtype=float)
+    x = np.log1p(np.asarray(annual_interest_rate, dtype=float))
+    P = np.asarray(contributions_per_year)
+    N = np.asarray(years)
+
+    series = _growth_series(x, P, N)[0]
+    return ((K_NP - K_0 * np.exp(N * x)) / series)[()]
+
+
+def compound_interest_years(
+    initial_balance: float | np.ndarray,
+    final_balance: float | np.ndarray,
+    annual_interest_rate: float | np.ndarray,
+    regular_contribution: float | np.ndarray,
+    contributions_per_year: int | np.ndarray,
+) -> float | np.ndarray:
+    """
+    The number of years until `initial_balance` grows to `final_balance` with the
+    given rate and contributions.
+
+    The result is not rounded: the balance reaches `final_balance` after
+    ceil(years * contributions_per_year) contributions. If the final balance is never
+    reached (or only before the start), the result is NaN.
+
+    All arguments can be arrays. They are broadcast against each other.
+
+    See README.md for a derivation.
+    """
+    K_0 = np.asarray(initial_balance, dtype=float)
+    K_NP = np.asarray(final_balance, dtype=float)
+    x = np.log1p(np.asarray(annual_interest_rate, dtype=float))
+    m = np.asarray(regular_contribution, dtype=float)
+    P = np.asarray(contributions_per_year)
+
+    # a rate of zero would divide by zero: the balance then grows linearly
+    zero_rate = x == 0
+    x_safe = np.where(zero_rate, 1.0, x)
+    g = np.expm1(x_safe / P)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = (K_NP - K_0) * g / (K_0 * g + m)
+        N = np.where(zero_rate, (K_NP - K_0) / (m * P), np.log1p(growth) / x_safe)
+    N = np.where(N >= 0, N, np.nan)
+    return N[()]
+
+
 def monthly_purchasing_power(
-    start_balance: float,
-    years_to_consume: int,
-    annual_rate_of_return: float,
-    annual_rate_of_inflation: float,
-) -> float:
+    start_balance: float | np.ndarray,
+    years_to_consume: int | np.ndarray,
+    annual_rate_of_return: float | np.ndarray,
+    annual_rate_of_inflation: float | np.ndarray,
+) -> float | np.ndarray:
     """
     The initial deposit value is `start_balance`.
     It is assumed that money is taken out of the deposit at the
@@ -116,14 +435,105 @@ def monthly_purchasing_power(
     to the inflation rate and (ii) after `years_to_consume` many
     years the end balance is zero.
     In other words, the purchasing power is the same in every month.
+
+    All arguments can be arrays. They are broadcast against each other.
+
+    See README.md for a derivation.
+    """
+    start_balance = np.asarray(start_balance, dtype=float)
+    annuity = _purchasing_power_annuity(
+        years_to_consume, annual_rate_of_return, annual_rate_of_inflation
+    )
+    return (start_balance * annuity)[()]
+
+
+def required_start_balance(
+    monthly_purchasing_power: float | np.ndarray,
+    years_to_consume: int | np.ndarray,
+    annual_rate_of_return: float | np.ndarray,
+    annual_rate_of_inflation: float | np.ndarray,
+) -> float | np.ndarray:
+    """
+    The start balance needed for the given monthly purchasing power, i.e. the inverse
+    of monthly_purchasing_power with respect to the start balance.
+
+    All arguments can be arrays. They are broadcast against each other.
+    """
+    mpp = np.asarray(monthly_purchasing_power, dtype=float)
+    annuity = _purchasing_power_annuity(
+        years_to_consume, annual_rate_of_return, annual_rate_of_inflation
+    )
+    return (mpp / annuity)[()]
+
+
+def monthly_purchasing_power_sensitivities(
+    start_balance: float | np.ndarray,
+    years_to_consume: int | np.ndarray,
+    annual_rate_of_return: float | np.ndarray,
+    annual_rate_of_inflation: float | np.ndarray,
+) -> dict[str, float | np.ndarray]:
+    """
+    The monthly purchasing power together with its partial derivatives.
+
+    Returns
+        "value": the monthly purchasing power,
+        "rate": the derivative with respect to the annual rate of return,
+        "inflation": the derivative with respect to the annual rate of inflation,
+        "start balance": the derivative with respect to the start balance,
+        "years": the derivative with respect to the (continuous) years to consume.
+
+    All arguments can be arrays. They are broadcast against each other.
+
+    See README.md for a derivation.
+    """
+    B = np.asarray(start_balance, dtype=float)
+    r = np.asarray(annual_rate_of_return, dtype=float)
+    q = np.asarray(annual_rate_of_inflation, dtype=float)
+    K = np.asarray(years_to_consume) * 12
+    d = (np.log1p(q) - np.log1p(r)) / 12
+
+    annuity = _purchasing_power_annuity(years_to_consume, r, q)
+    # derivatives of a(d) = expm1(d) / expm1(K d) with respect to d and K; close to
+    # d = 0, the quotients cancel and are replaced by their Taylor expansions
+    small = np.abs(K * d) < 1e-6
+    d_safe = np.where(small, 1 / K, d)
+    num = np.expm1(d_safe)
+    den = np.expm1(K * d_safe)
+    d_d = (np.exp(d_safe) * den - K * np.exp(K * d_safe) * num) / den**2
+    d_d = np.where(small, -(K - 1) / (2 * K), d_d)
+    d_K = -num * d_safe * np.exp(K * d_safe) / den**2
+    d_K = np.where(small, -(1 + d / 2) / K**2, d_K)
+
+    value = B * annuity
+    return {
+        "value": value[()],
+        "rate": (-B * d_d / (12 * (1 + r)))[()],
+        "inflation": (B * d_d / (12 * (1 + q)))[()],
+        "start balance": np.broadcast_to(annuity, value.shape)[()],
+        "years": (12 * B * d_K)[()],
+    }
+
+
+def _purchasing_power_annuity(
+    years_to_consume: int | np.ndarray,
+    annual_rate_of_return: float | np.ndarray,
+    annual_rate_of_inflation: float | np.ndarray,
+) -> np.ndarray:
+    """
+    The monthly purchasing power of a start balance of one.
     """
-    monthly_inflation = annual_to_monthly(annual_rate_of_inflation)
-    monthly_rate = annual_to_monthly(annual_rate_of_return)
-    K = years_to_consume * 12
-    rs_cum = 0
-    for i in range(1, K + 1):
-        rs_cum += monthly_inflation ** (K - i) * monthly_rate**i
-    return start_balance * monthly_rate**K / rs_cum
+    K = np.asarray(years_to_consume) * 12
+    # t = monthly inflation / monthly rate = exp(d)
+    d = (
+        np.log1p(np.asarray(annual_rate_of_inflation, dtype=float))
+        - np.log1p(np.asarray(annual_rate_of_return, dtype=float))
+    ) / 12
+    # rate == inflation would divide by zero: the growing annuity is then just K
+    same_rate = d == 0
+    d_safe = np.where(same_rate, 1.0, d)
+    # the placeholder d_safe = 1 may overflow for 60 or more consume years
+    with np.errstate(over="ignore"):
+        return np.where(same_rate, 1 / K, np.expm1(d_safe) / np.expm1(K * d_safe))
 
 
 def subtract_gains_tax(x):